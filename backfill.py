@@ -0,0 +1,539 @@
+import getopt
+import json
+import os
+import shutil
+import socket
+import sqlite3
+import sys
+import time
+import traceback
+
+import scrape
+
+'''
+Sharded backfill
+
+Spreads the pages of many leagues and years over any number of workers.
+
+	coordinator  enqueues the units of work of every league and year
+	workers      claim units from the queue, load and parse their page
+	             and write what they parsed to a shard (a season snapshot)
+	reducer      merges the shards of a finished league year into one
+	             Results and writes its standings and csv files
+
+The queue is a sqlite database, so workers on other machines only need
+the backfill directory on a shared disk. A claimed unit is leased for a
+while, when a worker crashes its lease runs out and the unit goes back
+to the next worker. Workers hold no state between units.
+
+Units that only become known from a page (a waiver date, a boxscore)
+are enqueued by the worker that parsed that page. Boxscores need the
+owners, draft and projections of their league year, so they are only
+handed out once those units are done.
+
+Every league year works in its own directory laid out like the one
+scrape.py runs in, with the page caches, shards and results, and the
+league's roster slots when they aren't the default ones.
+'''
+
+DefaultRoot = "backfill"
+
+QueueFile = "queue.db"
+
+# Seconds a worker has to finish a unit before it goes to another worker
+DefaultLeaseSeconds = 300
+
+# Seconds a worker waits when every unit left is leased or waiting on others
+PollSeconds = 5
+
+# Units failing this many times are given up on
+MaxAttempts = 3
+
+# Directories LoadContent caches pages in
+CacheDirectories = ['divisions', 'draft', 'projections', 'waivers', 'schedules', 'boxscores', 'results', 'shards']
+
+# Roster slots of a league year, see scrape.LoadRosterSlots
+RosterSlotsFile = "rosterSlots.json"
+
+# kind -> kinds of the same league year that have to be done first
+UnitNeeds = {
+	"schedule" : ["divisions"],
+	"boxscore" : ["divisions", "draft", "projections"]
+}
+
+QueueSchema = '''
+CREATE TABLE IF NOT EXISTS units (
+	id INTEGER PRIMARY KEY AUTOINCREMENT,
+	league TEXT NOT NULL,
+	year INTEGER NOT NULL,
+	kind TEXT NOT NULL,
+	page TEXT NOT NULL,
+	args TEXT NOT NULL,
+	state TEXT NOT NULL DEFAULT 'pending',
+	worker TEXT,
+	leaseExpires REAL NOT NULL DEFAULT 0,
+	attempts INTEGER NOT NULL DEFAULT 0,
+	shard TEXT,
+	error TEXT,
+	UNIQUE (league, year, kind, page)
+)
+'''
+
+# Claim looks units up by state in id order
+QueueIndex = "CREATE INDEX IF NOT EXISTS unitsByState ON units (state, id)"
+
+# Units a worker may lease: pending, or leased and the lease ran out
+ClaimableCondition = "(state = 'pending' OR (state = 'leased' AND leaseExpires < ?))"
+
+#
+# SQL condition on units that holds when their needs are done, see UnitNeeds
+# Returns (condition, parameters)
+#
+def GetReadyCondition():
+	conditions = []
+	parameters = []
+	for kind in sorted(UnitNeeds):
+		needs = UnitNeeds[kind]
+		conditions.append("(units.kind != ? OR NOT EXISTS (SELECT 1 FROM units AS need WHERE need.league = units.league AND need.year = units.year " +
+			"AND need.kind IN (" + ",".join("?" * len(needs)) + ") AND need.state != 'done'))")
+		parameters += [kind] + needs
+	return " AND ".join(conditions), parameters
+
+def GetWorkDirectory(root, league, year):
+	return os.path.join(root, str(league) + "-" + str(year))
+
+# Use the league year's roster slots, the default ones if it has none
+# Workers go from league to league so this is done for every unit
+def SetWorkRosterSlots(workDirectory):
+	path = os.path.join(workDirectory, RosterSlotsFile)
+	if os.path.exists(path):
+		scrape.LoadRosterSlots(path)
+	else:
+		scrape.SetRosterSlots(scrape.DefaultRosterSlots)
+
+# One unit of work as claimed from the queue
+class Unit:
+	def __init__(self, row):
+		self.id, self.league, self.year, self.kind, self.page, args = row
+		self.args = json.loads(args)
+
+'''
+Work queue in a sqlite database
+
+Every change happens in its own immediate transaction
+so any number of processes can share the file.
+'''
+class WorkQueue:
+	def __init__(self, path):
+		self.connection = sqlite3.connect(path, timeout=60, isolation_level=None)
+		self.connection.execute(QueueSchema)
+		self.connection.execute(QueueIndex)
+
+	def begin(self):
+		self.connection.execute("BEGIN IMMEDIATE")
+
+	def commit(self):
+		self.connection.execute("COMMIT")
+
+	def rollback(self):
+		self.connection.execute("ROLLBACK")
+
+	# units is a list of (league, year, kind, page, args)
+	# Units already in the queue are left alone
+	def add(self, units):
+		self.connection.executemany("INSERT OR IGNORE INTO units (league, year, kind, page, args) VALUES (?, ?, ?, ?, ?)",
+			[ (league, year, kind, page, json.dumps(args)) for league, year, kind, page, args in units ])
+
+	def Enqueue(self, units):
+		self.begin()
+		try:
+			self.add(units)
+			self.commit()
+		except:
+			self.rollback()
+			raise
+
+	#
+	# Lease the first unit that is pending, or whose lease ran out,
+	# and whose needs are done
+	# Returns None when there is no such unit
+	#
+	def Claim(self, worker, leaseSeconds):
+		now = time.time()
+		self.begin()
+		try:
+			# Units whose workers kept crashing are given up on
+			self.connection.execute("UPDATE units SET state = 'failed', error = 'lease expired' WHERE state = 'leased' AND leaseExpires < ? AND attempts >= ?",
+				(now, MaxAttempts))
+
+			ready, readyParameters = GetReadyCondition()
+			row = self.connection.execute("SELECT id, league, year, kind, page, args FROM units " +
+				"WHERE " + ClaimableCondition + " AND " + ready + " ORDER BY id LIMIT 1", [now] + readyParameters).fetchone()
+
+			# Only lease the unit if it is still claimable
+			leased = 0
+			if row is not None:
+				leased = self.connection.execute("UPDATE units SET state = 'leased', worker = ?, leaseExpires = ?, attempts = attempts + 1 " +
+					"WHERE id = ? AND " + ClaimableCondition, (worker, now + leaseSeconds, row[0], now)).rowcount
+
+			self.commit()
+			if leased == 0:
+				return None
+			return Unit(row)
+		except:
+			self.rollback()
+			raise
+
+	#
+	# Record the unit's shard and enqueue the units it found
+	# Returns False if the lease was lost to another worker,
+	# then nothing is recorded
+	#
+	def Complete(self, unit, worker, shard, newUnits):
+		self.begin()
+		try:
+			cursor = self.connection.execute("UPDATE units SET state = 'done', shard = ?, error = NULL WHERE id = ? AND state = 'leased' AND worker = ?",
+				(shard, unit.id, worker))
+			if cursor.rowcount != 1:
+				self.rollback()
+				return False
+
+			self.add(newUnits)
+			self.commit()
+			return True
+		except:
+			self.rollback()
+			raise
+
+	# Put the unit back in the queue, or give up on it after MaxAttempts
+	def Fail(self, unit, worker, error):
+		self.begin()
+		try:
+			self.connection.execute("UPDATE units SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, " +
+				"error = ?, leaseExpires = 0 WHERE id = ? AND state = 'leased' AND worker = ?",
+				(MaxAttempts, error, unit.id, worker))
+			self.commit()
+		except:
+			self.rollback()
+			raise
+
+	# Someone is still working on a unit, so more may become claimable
+	def HasLeased(self):
+		return self.connection.execute("SELECT COUNT(*) FROM units WHERE state = 'leased'").fetchone()[0] > 0
+
+	# list of (league, year)
+	def LeagueYears(self):
+		return self.connection.execute("SELECT DISTINCT league, year FROM units ORDER BY league, year").fetchall()
+
+	# state -> number of units
+	def States(self, league, year):
+		return dict(self.connection.execute("SELECT state, COUNT(*) FROM units WHERE league = ? AND year = ? GROUP BY state", (league, year)).fetchall())
+
+	# Shards of a league year in unit order, only of kinds if given
+	def Shards(self, league, year, kinds=None):
+		rows = self.connection.execute("SELECT kind, shard FROM units WHERE league = ? AND year = ? AND shard IS NOT NULL ORDER BY id", (league, year)).fetchall()
+		return [ shard for kind, shard in rows if kinds is None or kind in kinds ]
+
+	# list of (kind, page, attempts, error) of every failed unit
+	def Failures(self, league, year):
+		return self.connection.execute("SELECT kind, page, attempts, error FROM units WHERE league = ? AND year = ? AND state = 'failed' ORDER BY id", (league, year)).fetchall()
+
+'''
+Coordinator
+'''
+
+# Every unit of a league year known without loading a page
+def GetLeagueYearUnits(league, year):
+	results = NewResults(league, year)
+
+	units = [(league, year, "divisions", "", None), (league, year, "draft", "", None)]
+	for job in scrape.GetProjectionJobs(results):
+		units.append((league, year, "projections", job[2], job))
+	units.append((league, year, "waivers", "", None))
+	units.append((league, year, "schedule", "", None))
+	return units
+
+# rosterSlotsFile is copied to every league year, None for the default slots
+def Coordinate(workQueue, root, leagues, years, rosterSlotsFile=None):
+	for league in leagues:
+		for year in years:
+			if rosterSlotsFile is not None:
+				workDirectory = GetWorkDirectory(root, league, year)
+				if not os.path.exists(workDirectory):
+					os.makedirs(workDirectory)
+				shutil.copyfile(rosterSlotsFile, os.path.join(workDirectory, RosterSlotsFile))
+
+			workQueue.Enqueue(GetLeagueYearUnits(league, year))
+			print("Enqueued " + str(league) + " " + str(year))
+
+'''
+Workers
+
+Each handler loads and parses the unit's page into results
+and returns the units found on the page.
+'''
+
+def NewResults(league, year):
+	results = scrape.Results()
+	results.leagueId = str(league)
+	results.year = int(year)
+	return results
+
+def RunDivisions(unit, results, deps):
+	scrape.LoadDivisions(results)
+	return []
+
+def RunDraft(unit, results, deps):
+	scrape.LoadDraft(results)
+	return []
+
+def RunProjections(unit, results, deps):
+	url, directory, filename, scoringPeriodId = unit.args
+	scrape.ParseProjectionFile(scrape.LoadContent(url, directory, filename), scoringPeriodId, results)
+	return []
+
+def RunWaivers(unit, results, deps):
+	return [ (unit.league, unit.year, "waiver", job[3], job) for job in scrape.GetWaiverJobs(results) ]
+
+def RunWaiver(unit, results, deps):
+	url, directory, filename, date = unit.args
+	scrape.ParseWaiverPage(scrape.LoadContent(url, directory, filename), date, results)
+	return []
+
+def RunSchedule(unit, results, deps):
+	results.divisions = deps.divisions
+	manifest = scrape.ParseSchedule(results)
+	return [ (unit.league, unit.year, "boxscore", entry["file"], entry) for entry in manifest ]
+
+# The page parses against the league year's owners, draft and projections
+# but only what the page itself added goes in the shard.
+# Its own registry starts with the deps' players under the same ids,
+# so the draft map and projections still line up and deps stay as they were.
+def RunBoxscore(unit, results, deps):
+	entry = unit.args
+
+	for name in deps.players.names:
+		results.players.Intern(name)
+	results.playerDraftMap = deps.playerDraftMap
+	results.projections = deps.projections
+	results.divisions = deps.divisions
+	results.InitializeWithOwners()
+
+	content = scrape.LoadContent(entry["url"], "boxscores", entry["file"])
+	scrape.ParseStatsPage(content, results, week=str(entry["week"]))
+
+	results.playerDraftMap = []
+	results.projections = []
+	return []
+
+UnitHandlers = {
+	"divisions" : RunDivisions,
+	"draft" : RunDraft,
+	"projections" : RunProjections,
+	"waivers" : RunWaivers,
+	"waiver" : RunWaiver,
+	"schedule" : RunSchedule,
+	"boxscore" : RunBoxscore
+}
+
+#
+# Merged shards of the units a kind needs
+# Kept per worker since they never change once done
+#
+def GetDeps(workQueue, deps, unit):
+	key = (unit.league, unit.year, unit.kind)
+	if key not in deps:
+		results = NewResults(unit.league, unit.year)
+		for shard in workQueue.Shards(unit.league, unit.year, UnitNeeds[unit.kind]):
+			MergeShard(results, scrape.LoadResults(shard))
+		deps[key] = results
+	return deps[key]
+
+def RunUnit(workQueue, root, worker, deps, unit):
+	workDirectory = os.path.abspath(GetWorkDirectory(root, unit.league, unit.year))
+	for directory in CacheDirectories:
+		path = os.path.join(workDirectory, directory)
+		if not os.path.exists(path):
+			os.makedirs(path)
+
+	SetWorkRosterSlots(workDirectory)
+
+	unitDeps = None
+	if unit.kind in UnitNeeds:
+		unitDeps = GetDeps(workQueue, deps, unit)
+
+	# Loaders read and write their caches relative to the league year
+	cwd = os.getcwd()
+	os.chdir(workDirectory)
+	try:
+		results = NewResults(unit.league, unit.year)
+		newUnits = UnitHandlers[unit.kind](unit, results, unitDeps)
+
+		# Write under a temporary name so a crash never leaves a partial shard
+		shard = os.path.join(workDirectory, "shards", str(unit.id) + "-" + worker + ".snap")
+		scrape.SaveResults(results, shard + ".tmp")
+		os.rename(shard + ".tmp", shard)
+	finally:
+		os.chdir(cwd)
+
+	if not workQueue.Complete(unit, worker, shard, newUnits):
+		print("Lost the lease on " + unit.kind + " " + unit.page)
+		os.remove(shard)
+
+#
+# Claim units until no unit is left to claim
+# Waits while other workers hold units that may unblock more
+#
+def Work(workQueue, root, worker, leaseSeconds):
+	deps = {}
+	while True:
+		unit = workQueue.Claim(worker, leaseSeconds)
+		if unit is None:
+			if not workQueue.HasLeased():
+				return
+			time.sleep(PollSeconds)
+			continue
+
+		print(worker + ": " + unit.kind + " " + unit.page + " " + str(unit.league) + " " + str(unit.year))
+		try:
+			RunUnit(workQueue, root, worker, deps, unit)
+		except Exception:
+			error = traceback.format_exc()
+			print(error)
+			workQueue.Fail(unit, worker, error)
+
+'''
+Reducer
+'''
+
+def AddStanding(standing, shardStanding):
+	standing.wins += shardStanding.wins
+	standing.losses += shardStanding.losses
+	standing.ties += shardStanding.ties
+	standing.points += shardStanding.points
+
+def AddStandings(standings, shardStandings):
+	for owner in shardStandings:
+		if owner in standings:
+			AddStanding(standings[owner], shardStandings[owner])
+
+# Ids in shards are only unique within the shard so every player is interned again
+def MergeShard(results, shard):
+	playerIds = [ results.players.Intern(name) for name in shard.players.names ]
+
+	for source in shard.players.joins:
+		joins = results.players.joins.setdefault(source, [0, 0])
+		joins[0] += shard.players.joins[source][0]
+		joins[1] += shard.players.joins[source][1]
+	for key in shard.players.collisions:
+		results.players.AddCollision(key, shard.players.collisions[key])
+
+	if len(results.divisions["east"] + results.divisions["west"]) == 0 and len(shard.divisions["east"] + shard.divisions["west"]) > 0:
+		results.divisions = shard.divisions
+		results.InitializeWithOwners()
+
+	for shardId,draftInfo in enumerate(shard.playerDraftMap):
+		if draftInfo is not None:
+			scrape.SetPlayerColumn(results.playerDraftMap, playerIds[shardId], draftInfo)
+
+	# Each projections page fills in one week of its players
+	for shardId,weeklyProjections in enumerate(shard.projections):
+		if weeklyProjections is None:
+			continue
+		merged = scrape.GetPlayerColumn(results.projections, playerIds[shardId])
+		if merged is None:
+			merged = [0]*13
+			scrape.SetPlayerColumn(results.projections, playerIds[shardId], merged)
+		for week,projection in enumerate(weeklyProjections):
+			if projection != 0:
+				merged[week] = projection
+
+	for table, rowClass, field in scrape.SnapshotRowTables:
+		rows = getattr(shard, field)
+		scrape.RemapRowPlayerIds(rows, playerIds)
+		getattr(results, field).extend(rows)
+
+	AddStandings(results.standings, shard.standings)
+	AddStandings(results.standingsOptimal, shard.standingsOptimal)
+	for owner in shard.standingsIndividualOptimal:
+		if owner in results.standingsIndividualOptimal:
+			AddStandings(results.standingsIndividualOptimal[owner], shard.standingsIndividualOptimal[owner])
+
+# Merge every finished league year and write its results
+def Reduce(workQueue, root):
+	for league, year in workQueue.LeagueYears():
+		states = workQueue.States(league, year)
+		if states.get("done", 0) != sum(states.values()):
+			print(str(league) + " " + str(year) + " is not done: " + json.dumps(states, sort_keys=True))
+			for kind, page, attempts, error in workQueue.Failures(league, year):
+				print("\tfailed " + kind + " " + page + " after " + str(attempts) + " attempts")
+			continue
+
+		SetWorkRosterSlots(GetWorkDirectory(root, league, year))
+
+		results = NewResults(league, year)
+		for shard in workQueue.Shards(league, year):
+			MergeShard(results, scrape.LoadResults(shard))
+
+		cwd = os.getcwd()
+		os.chdir(GetWorkDirectory(root, league, year))
+		try:
+			scrape.FinishResults(results)
+			scrape.SaveResults(results, scrape.SeasonSnapshotFile)
+			results.Output()
+		finally:
+			os.chdir(cwd)
+
+		print("Reduced " + str(league) + " " + str(year))
+
+def PrintStatus(workQueue):
+	for league, year in workQueue.LeagueYears():
+		print(str(league) + " " + str(year) + ": " + json.dumps(workQueue.States(league, year), sort_keys=True))
+
+def main(argv):
+	try:
+		opts, args = getopt.getopt(argv, "ewrsd:l:y:n:t:u:o:")
+	except getopt.GetoptError:
+		print("backfill.py -e [enqueue] -w [work] -r [reduce] -s [status] -d [backfill directory] -l [league ids like 1,2] -y [years like 2016-2017] -n [worker name] -t [lease seconds] -u [espn host like http://localhost:8000] -o [roster slots json for the enqueued leagues]")
+		sys.exit(2)
+
+	modes = []
+	root = DefaultRoot
+	leagues = [scrape.DefaultLeagueId]
+	years = [2016]
+	worker = socket.gethostname() + "-" + str(os.getpid())
+	leaseSeconds = DefaultLeaseSeconds
+	rosterSlotsFile = None
+	for opt, arg in opts:
+		if opt in ('-e', '-w', '-r', '-s'):
+			modes.append(opt)
+		elif opt == '-d':
+			root = arg
+		elif opt == '-l':
+			leagues = arg.split(',')
+		elif opt == '-y':
+			years = sorted(scrape.ParseWeeks(arg))
+		elif opt == '-n':
+			worker = arg
+		elif opt == '-t':
+			leaseSeconds = float(arg)
+		elif opt == '-u':
+			scrape.SetEspnHost(arg)
+		elif opt == '-o':
+			rosterSlotsFile = arg
+
+	if not os.path.exists(root):
+		os.makedirs(root)
+	workQueue = WorkQueue(os.path.join(root, QueueFile))
+
+	if '-e' in modes:
+		Coordinate(workQueue, root, leagues, years, rosterSlotsFile)
+	if '-w' in modes:
+		Work(workQueue, root, worker, leaseSeconds)
+	if '-r' in modes:
+		Reduce(workQueue, root)
+	if '-s' in modes or len(modes) == 0:
+		PrintStatus(workQueue)
+
+if __name__ == '__main__':
+	main(sys.argv[1:])
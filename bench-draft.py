@@ -0,0 +1,115 @@
+from bs4 import BeautifulSoup
+import getopt
+import sys
+import time
+
+import extract
+import scrape
+
+'''
+Draft recap parser benchmark
+
+Builds a synthetic draft recap for a league of any size and times the
+old sibling walk against the single pass parsers on it, in both page
+layouts: every team in its own table like the current recap, and all
+teams sharing one table. Every parser must give each team exactly its
+own picks.
+'''
+
+Positions = [", PIT QB", ", NE RB", ", KC WR", ", GB TE", " D/ST"]
+
+def TeamPicks(team, rounds):
+	picks = []
+	for rnd in range(rounds):
+		pick = team*rounds + rnd
+		pos = Positions[pick % len(Positions)]
+		name = ("Club" if pos == " D/ST" else "Player") + str(pick) + (" D/ST" if pos == " D/ST" else " Name")
+		picks.append('<tr><td>' + str(rnd+1) + '</td><td><a href="#">' + name + '</a>' + pos + '</td><td>$' + str(1 + pick % 60) + '</td></tr>')
+	return picks
+
+def TeamHead(team):
+	return '<tr class="tableHead"><td colspan="3"><a href="#" title="Team ' + str(team) + ' (Owner ' + str(team) + ')">Team ' + str(team) + '</a></td></tr>'
+
+# Every team in its own table
+def BuildTablePerTeam(teams, rounds):
+	tables = []
+	for team in range(teams):
+		tables.append('<table class="games-full-col">' + TeamHead(team) + "".join(TeamPicks(team, rounds)) + '</table>')
+	return '<html><body>' + "".join(tables) + '</body></html>'
+
+# All teams in one table
+def BuildSingleTable(teams, rounds):
+	rows = []
+	for team in range(teams):
+		rows.append(TeamHead(team))
+		rows += TeamPicks(team, rounds)
+	return '<html><body><table class="games-full-col">' + "".join(rows) + '</table></body></html>'
+
+# What LoadDraft used to do: every row after each tableHead row
+def SiblingRows(content):
+	soup = BeautifulSoup(content, 'html.parser')
+
+	rows = []
+	for team in soup.find_all('tr', class_='tableHead'):
+		for player in team.find_next_siblings('tr'):
+			data = player.find_all('td')
+			if len(data) < 3 or data[1].a is None:
+				continue
+			rows.append((team.a['title'], data[1].a.text, data[1].text, data[2].text))
+	return rows
+
+def ParseIntoResults(content):
+	results = scrape.Results()
+	scrape.ParseDraftPage(content, results)
+	return results.allDraftData
+
+# True when every team got exactly its own rounds picks
+def IsAttributedCorrectly(rows, teams, rounds):
+	counts = {}
+	for ownerTitle, playerName, playerData, amount in rows:
+		counts[ownerTitle] = counts.get(ownerTitle, 0) + 1
+
+		team = int(playerName.split()[0][len("Club") if playerName.startswith("Club") else len("Player"):]) // rounds
+		if ownerTitle != "Team " + str(team) + " (Owner " + str(team) + ")":
+			return False
+	return len(counts) == teams and all(count == rounds for count in counts.values())
+
+def Time(function, content, repeats):
+	start = time.time()
+	for index in range(repeats):
+		rows = list(function(content))
+	return (time.time() - start) / repeats, rows
+
+def main(argv):
+	try:
+		opts, args = getopt.getopt(argv, "t:r:n:")
+	except getopt.GetoptError:
+		print("bench-draft.py -t [teams] -r [rounds] -n [repeats]")
+		sys.exit(2)
+
+	teams = 16
+	rounds = 20
+	repeats = 5
+	for opt, arg in opts:
+		if opt == '-t':
+			teams = int(arg)
+		elif opt == '-r':
+			rounds = int(arg)
+		elif opt == '-n':
+			repeats = int(arg)
+
+	layouts = [("table per team", BuildTablePerTeam(teams, rounds)), ("single table", BuildSingleTable(teams, rounds))]
+	parsers = [("sibling walk", SiblingRows), ("GetDraftRows", scrape.GetDraftRows), ("ExtractDraft", extract.ExtractDraft)]
+
+	print(str(teams) + " teams, " + str(rounds) + " rounds")
+	for layout, content in layouts:
+		for name, function in parsers:
+			seconds, rows = Time(function, content, repeats)
+			correct = "correct" if IsAttributedCorrectly(rows, teams, rounds) else "WRONG"
+			print(layout + ", " + name + ": " + str(round(seconds * 1000, 1)) + "ms, " + str(len(rows)) + " picks, " + correct)
+
+		seconds, rows = Time(ParseIntoResults, content, repeats)
+		print(layout + ", ParseDraftPage: " + str(round(seconds * 1000, 1)) + "ms, " + str(len(rows)) + " picks")
+
+if __name__ == '__main__':
+	main(sys.argv[1:])
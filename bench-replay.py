@@ -0,0 +1,103 @@
+import getopt
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import replay
+
+'''
+Cold cache benchmark
+
+Starts a replay server on a recorded cache and times one full
+scrape.py run against it from empty cache directories, so every page
+goes through the network code. The finished csvs can be compared with
+the results of an earlier run to check nothing was lost on the way.
+'''
+
+ScrapeFile = os.path.join(os.path.dirname(os.path.abspath(__file__)), "scrape.py")
+
+# Directories scrape.py expects to exist
+WorkDirectories = ["boxscores", "divisions", "draft", "projections", "results", "schedules", "waivers"]
+
+# Bytes of a csv, None if it wasn't written
+def ReadResult(filepath):
+	if not os.path.exists(filepath):
+		return None
+	with open(filepath, "rb") as f:
+		return f.read()
+
+# Names of the csvs in resultsDir that differ from the ones in expectedDir
+# Pages are parsed in job order however they arrive, so a run on the
+# same cache writes every csv byte for byte the same, rows in the same order
+def CompareResults(resultsDir, expectedDir):
+	names = sorted([ item for item in os.listdir(expectedDir) if item.endswith(".csv") ])
+	return [ name for name in names if ReadResult(os.path.join(resultsDir, name)) != ReadResult(os.path.join(expectedDir, name)) ]
+
+def main(argv):
+	try:
+		opts, args = getopt.getopt(argv, "d:y:i:l:b:e:t:c:k")
+	except getopt.GetoptError:
+		print("bench-replay.py -d [recorded cache directory] -y [year] -i [league id] -l [latency ms] -b [bandwidth KB/s] -e [error rate like 0.05] -t [requests per second before 429s] -c [results dir to compare with] -k [keep the run directory]")
+		sys.exit(2)
+
+	root = "."
+	scrapeArgs = []
+	latency = 0
+	bandwidth = 0
+	errorRate = 0
+	rateLimit = 0
+	expectedDir = None
+	keep = False
+	for opt, arg in opts:
+		if opt == '-d':
+			root = arg
+		elif opt in ('-y', '-i'):
+			scrapeArgs += [opt, arg]
+		elif opt == '-l':
+			latency = float(arg) / 1000
+		elif opt == '-b':
+			bandwidth = float(arg) * 1024
+		elif opt == '-e':
+			errorRate = float(arg)
+		elif opt == '-t':
+			rateLimit = float(arg)
+		elif opt == '-c':
+			expectedDir = os.path.abspath(arg)
+		elif opt == '-k':
+			keep = True
+
+	runDir = tempfile.mkdtemp(prefix="bench-replay-")
+	for name in WorkDirectories:
+		os.mkdir(os.path.join(runDir, name))
+
+	server = replay.StartReplayServer(os.path.abspath(root), 0, latency, bandwidth, errorRate, rateLimit)
+
+	start = time.time()
+	with open(os.path.join(runDir, "run.log"), "w") as log:
+		status = subprocess.call([sys.executable, ScrapeFile, "-u", replay.GetServerHost(server)] + scrapeArgs, cwd=runDir, stdout=log, stderr=subprocess.STDOUT)
+	seconds = time.time() - start
+
+	server.shutdown()
+
+	print("Cold cache run: " + str(round(seconds, 2)) + "s, exit status " + str(status))
+	print("Server: " + server.stats.Summary())
+
+	if expectedDir is not None:
+		different = CompareResults(os.path.join(runDir, "results"), expectedDir)
+		if len(different) == 0:
+			print("Results match " + expectedDir)
+		else:
+			print("Results differ from " + expectedDir + ": " + ", ".join(different))
+
+	if keep or status != 0:
+		print("Run directory: " + runDir)
+	else:
+		shutil.rmtree(runDir)
+
+	sys.exit(status)
+
+if __name__ == '__main__':
+	main(sys.argv[1:])
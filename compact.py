@@ -0,0 +1,75 @@
+import getopt
+import hashlib
+import os
+import sys
+
+import scrape
+
+'''
+Compact existing page caches
+
+Rewrites every cached page in the directories scrape.py compacts on
+download (see scrape.CompactFragments) keeping only the fragments the
+parsers read. Pages already compacted are skipped, so it can be run
+again at any time. The sha1s in a boxscore manifest are updated for
+the pages that get rewritten.
+'''
+
+def CompactDirectory(directory):
+	before = 0
+	after = 0
+	pages = 0
+
+	# page -> sha1 of the compacted page
+	rewritten = {}
+	for item in sorted(os.listdir(directory)):
+		if not (item.endswith(".html") or item.endswith(".htm")):
+			continue
+
+		filepath = os.path.join(directory, item)
+		with open(filepath, "rb") as f:
+			content = f.read()
+
+		compacted = scrape.CompactPage(directory, content)
+		if compacted is not content:
+			# Write next to the page first so a crash never leaves half a page
+			with open(filepath + ".tmp", "wb") as f:
+				f.write(compacted)
+			os.rename(filepath + ".tmp", filepath)
+			rewritten[item] = hashlib.sha1(compacted).hexdigest()
+			pages += 1
+
+		before += len(content)
+		after += len(compacted)
+
+	manifest = scrape.LoadBoxscoreManifest(directory)
+	if manifest is not None and len(rewritten) > 0:
+		for entry in manifest:
+			if entry["file"] in rewritten:
+				entry["sha1"] = rewritten[entry["file"]]
+		scrape.WriteBoxscoreManifest(directory, manifest)
+
+	return pages, before, after
+
+def main(argv):
+	try:
+		opts, args = getopt.getopt(argv, "d:")
+	except getopt.GetoptError:
+		print("compact.py -d [directory holding the caches]")
+		sys.exit(2)
+
+	root = "."
+	for opt, arg in opts:
+		if opt == '-d':
+			root = arg
+
+	for name in sorted(scrape.CompactFragments):
+		directory = os.path.join(root, name)
+		if not os.path.isdir(directory):
+			continue
+
+		pages, before, after = CompactDirectory(directory)
+		print(name + ": compacted " + str(pages) + " pages, " + str(before // 1024) + "K -> " + str(after // 1024) + "K")
+
+if __name__ == '__main__':
+	main(sys.argv[1:])
@@ -0,0 +1,368 @@
+import codecs
+
+try:
+	from HTMLParser import HTMLParser
+	from htmlentitydefs import name2codepoint
+	unichr = unichr
+except ImportError:
+	from html.parser import HTMLParser
+	from html.entities import name2codepoint
+	unichr = chr
+
+'''
+Streaming extractors
+
+An incremental tokenizer is fed each page a chunk at a time and the
+table rows the parsers need are picked out as they stream past,
+so no tree of the page is ever built. Rows are yielded as soon as
+they end and only the rows that are still open are held in memory.
+
+Every extractor returns exactly what the BeautifulSoup one in scrape.py
+returns for the same page, see scrape.VerifyExtractors.
+'''
+
+# Characters fed to the tokenizer at once
+ChunkSize = 16384
+
+# Tags whose first occurrence inside a cell is kept, like cell.a in BeautifulSoup
+CellChildTags = ["a", "strong", "b"]
+
+def GetClasses(attrs):
+	for name, value in attrs:
+		if name == "class" and value is not None:
+			return value.split()
+	return []
+
+# Same matching as BeautifulSoup's class_ argument
+# '' matches no class, a name with spaces matches the whole class string
+def ClassMatches(classes, name):
+	if name == "":
+		return len(classes) == 0
+	return name in classes or " ".join(classes) == name
+
+# One td, text holds the pieces of all text inside it
+class Cell:
+	def __init__(self, classes):
+		self.classes = classes
+		self.pieces = []
+
+		# tag -> (attrs, text pieces) of the first such tag in the cell
+		self.children = {}
+
+	def Text(self):
+		return u"".join(self.pieces)
+
+	def ChildText(self, tag):
+		child = self.children.get(tag)
+		if child is None:
+			return None
+		return u"".join(child[1])
+
+	def ChildAttr(self, tag, attr):
+		child = self.children.get(tag)
+		if child is None:
+			return None
+		return child[0].get(attr)
+
+class Row:
+	def __init__(self, table, classes):
+		self.table = table
+		self.classes = classes
+		self.cells = []
+
+'''
+Tokenizer callbacks turned into rows
+
+isTable(classes) picks the tables rows are taken from and
+isRow(classes) the rows within them. Like find_all, rows and cells
+nested inside other rows belong to every row around them.
+'''
+class RowStream(HTMLParser):
+	def __init__(self, isTable, isRow):
+		HTMLParser.__init__(self)
+		self.isTable = isTable
+		self.isRow = isRow
+
+		# Number of target tables seen, the current one is tableCount-1
+		self.tableCount = 0
+
+		# Open tags that matter
+		# [tag, list of text piece lists it feeds, Row or Cell it opened]
+		self.stack = []
+
+		# Depth in stack of the target table, -1 outside of one
+		self.tableDepth = -1
+
+		# Rows still open and rows waiting for the rows around them
+		self.openRows = []
+		self.waitingRows = []
+
+		# Finished rows not yet handed out
+		self.rows = []
+
+	def startTag(self, tag, attrs):
+		pass
+
+	def endTag(self, tag):
+		pass
+
+	def handle_starttag(self, tag, attrs):
+		self.startTag(tag, attrs)
+		sinks = []
+		opened = None
+
+		if tag == "table" and self.tableDepth == -1 and self.isTable(GetClasses(attrs)):
+			self.tableDepth = len(self.stack)
+			self.tableCount += 1
+		elif tag == "tr" and self.tableDepth > -1 and self.isRow(GetClasses(attrs)):
+			opened = Row(self.tableCount-1, GetClasses(attrs))
+			self.openRows.append(opened)
+			self.waitingRows.append(opened)
+		elif tag == "td" and len(self.openRows) > 0:
+			opened = Cell(GetClasses(attrs))
+			for row in self.openRows:
+				row.cells.append(opened)
+			sinks.append(opened.pieces)
+		elif tag in CellChildTags:
+			for entry in self.stack:
+				cell = entry[2]
+				if isinstance(cell, Cell) and tag not in cell.children:
+					cell.children[tag] = (dict(attrs), [])
+					sinks.append(cell.children[tag][1])
+			if len(sinks) == 0:
+				return
+		elif tag not in ("table", "tr", "td", "div", "em"):
+			return
+
+		self.stack.append([tag, sinks, opened])
+
+	def handle_startendtag(self, tag, attrs):
+		self.startTag(tag, attrs)
+
+	def handle_endtag(self, tag):
+		self.endTag(tag)
+
+		# Close everything opened after the matching tag
+		index = len(self.stack) - 1
+		while index >= 0 and self.stack[index][0] != tag:
+			index -= 1
+		if index < 0:
+			return
+
+		while len(self.stack) > index:
+			closed = self.stack.pop()
+			if isinstance(closed[2], Row):
+				self.openRows.pop()
+				if len(self.openRows) == 0:
+					self.rows += self.waitingRows
+					self.waitingRows = []
+			if len(self.stack) == self.tableDepth:
+				self.tableDepth = -1
+
+	def handle_data(self, data):
+		self.text(data)
+
+	def handle_entityref(self, name):
+		if name in name2codepoint:
+			self.text(unichr(name2codepoint[name]))
+		else:
+			self.text(u"&" + name + u";")
+
+	def handle_charref(self, name):
+		if name.startswith("x") or name.startswith("X"):
+			self.text(unichr(int(name[1:], 16)))
+		else:
+			self.text(unichr(int(name)))
+
+	def text(self, data):
+		for entry in self.stack:
+			for sink in entry[1]:
+				sink.append(data)
+
+	# Feed the page a chunk at a time, yielding rows as they finish
+	def Stream(self, content):
+		decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+		for start in range(0, len(content), ChunkSize):
+			chunk = content[start:start+ChunkSize]
+			if not isinstance(chunk, type(u"")):
+				chunk = decoder.decode(chunk)
+			self.feed(chunk)
+
+			rows = self.rows
+			self.rows = []
+			for row in rows:
+				yield row
+
+		self.close()
+		for row in self.rows:
+			yield row
+
+# Only the first table picked by isTable
+def FirstTable(isTable):
+	seen = []
+	def matches(classes):
+		if len(seen) == 0 and isTable(classes):
+			seen.append(True)
+			return True
+		return False
+	return matches
+
+'''
+Boxscore pages
+'''
+
+StarterTableClass = "playerTableTable tableBody"
+BenchTableClass = "playerTableTable tableBody hideableGroup"
+
+class BoxscoreStream(RowStream):
+	def __init__(self):
+		RowStream.__init__(self,
+			lambda classes: ClassMatches(classes, StarterTableClass) or ClassMatches(classes, BenchTableClass),
+			lambda classes: ClassMatches(classes, "pncPlayerRow") or ClassMatches(classes, "playerTableBgRowHead"))
+
+		# target table index -> True for bench tables
+		self.benchTables = []
+
+		# Text of the first em in the first games-pageheader div
+		self.header = None
+		self.headerPieces = None
+		self.inHeader = False
+		self.inHeaderEm = False
+
+		# Text of every teamInfoOwnerData div
+		self.owners = []
+		self.ownerPieces = None
+
+	def startTag(self, tag, attrs):
+		classes = GetClasses(attrs)
+		if tag == "table" and self.tableDepth == -1 and self.isTable(classes):
+			self.benchTables.append(ClassMatches(classes, BenchTableClass) and not ClassMatches(classes, StarterTableClass))
+		elif tag == "div" and self.header is None and self.headerPieces is None and ClassMatches(classes, "games-pageheader"):
+			self.inHeader = True
+		elif tag == "em" and self.inHeader and self.headerPieces is None:
+			self.headerPieces = []
+			self.inHeaderEm = True
+		elif tag == "div" and ClassMatches(classes, "teamInfoOwnerData"):
+			self.ownerPieces = []
+			self.owners.append(self.ownerPieces)
+
+	def endTag(self, tag):
+		if tag == "em" and self.inHeaderEm:
+			self.header = u"".join(self.headerPieces)
+			self.inHeader = False
+			self.inHeaderEm = False
+		elif tag == "div":
+			self.ownerPieces = None
+
+	def text(self, data):
+		RowStream.text(self, data)
+		if self.inHeaderEm:
+			self.headerPieces.append(data)
+		if self.ownerPieces is not None:
+			self.ownerPieces.append(data)
+
+# BeautifulSoup writes text back out with these escaped
+def EscapeText(text):
+	return text.replace(u"&", u"&amp;").replace(u"<", u"&lt;").replace(u">", u"&gt;")
+
+def FindCell(row, className):
+	for cell in row.cells:
+		if ClassMatches(cell.classes, className):
+			return cell
+	return None
+
+#
+# Same as scrape.GetBoxscoreTables
+#
+def ExtractBoxscore(content):
+	stream = BoxscoreStream()
+
+	# target table index -> [team name, rows]
+	tables = []
+	for row in stream.Stream(content):
+		while len(tables) <= row.table:
+			tables.append([None, []])
+		table = tables[row.table]
+
+		if ClassMatches(row.classes, "playerTableBgRowHead"):
+			if table[0] is None and len(row.cells) > 0:
+				table[0] = row.cells[0].Text()[:-9].strip().upper()
+			if not ClassMatches(row.classes, "pncPlayerRow"):
+				continue
+
+		label = FindCell(row, "playerSlot").Text().strip()
+		playerInfo = FindCell(row, "playertablePlayerName")
+		if playerInfo is None:
+			table[1].append((label, None, u"", u"", u""))
+			continue
+
+		table[1].append((label, playerInfo.ChildText("a").strip(), playerInfo.Text().strip(), FindCell(row, "").Text(), FindCell(row, "playertableStat").Text()))
+
+	while len(tables) < stream.tableCount:
+		tables.append([None, []])
+
+	teamNames = []
+	starters = []
+	benches = []
+	for index,table in enumerate(tables):
+		if stream.benchTables[index]:
+			benches.append(table[1])
+		else:
+			teamNames.append(table[0])
+			starters.append(table[1])
+
+	owners = [ EscapeText(u"".join(pieces)).encode('utf-8') for pieces in stream.owners ]
+	return stream.header, teamNames, owners, starters, benches
+
+'''
+Projection pages
+'''
+
+#
+# Same as scrape.GetProjectionRows
+#
+def ExtractProjections(content):
+	stream = RowStream(FirstTable(lambda classes: ClassMatches(classes, "tableBody")), lambda classes: ClassMatches(classes, "pncPlayerRow"))
+	for row in stream.Stream(content):
+		if len(row.cells) != 16 and len(row.cells) != 13:
+			continue
+		yield (row.cells[0].ChildText("a"), row.cells[len(row.cells)-1].Text())
+
+'''
+Waiver pages
+'''
+
+#
+# Same as scrape.GetWaiverRows
+#
+def ExtractWaivers(content):
+	stream = RowStream(FirstTable(lambda classes: ClassMatches(classes, "tableBody")), lambda classes: True)
+	for row in stream.Stream(content):
+		cells = row.cells
+		if len(cells) < 5:
+			continue
+		yield (cells[1].ChildAttr("a", "title"), cells[2].Text(), cells[2].ChildText("a"), cells[3].Text(), cells[4].ChildText("strong"), cells[4].ChildText("b"), cells[4].Text())
+
+'''
+Draft recap pages
+'''
+
+#
+# Same as scrape.GetDraftRows
+#
+def ExtractDraft(content):
+	stream = RowStream(lambda classes: True, lambda classes: True)
+	ownerTitle = None
+	for row in stream.Stream(content):
+		cells = row.cells
+		if ClassMatches(row.classes, "tableHead"):
+			ownerTitle = None
+			for cell in cells:
+				if "a" in cell.children:
+					ownerTitle = cell.ChildAttr("a", "title")
+					break
+			continue
+
+		if ownerTitle is None or len(cells) < 3 or cells[1].ChildText("a") is None:
+			continue
+		yield (ownerTitle, cells[1].ChildText("a"), cells[1].Text(), cells[2].Text())
@@ -1,5 +1,13 @@
+from array import array
 from enum import Enum
-from random import sample
+from multiprocessing import Pool
+from random import sample, seed
+import csv
+import getopt
+import hashlib
+import math
+import os
+import sys
 
 Weeks = 13
 
@@ -14,7 +22,7 @@ class M(Enum):
 	mel = 7
 	bot = 8
 	drew = 9
-	
+
 class D(Enum):
 	east = 0
 	west = 1
@@ -22,76 +30,103 @@ class D(Enum):
 divisions = {D.east: [M.brecht, M.nick, M.phil, M.kevin, M.andy],
 	D.west: [M.jack, M.micah, M.mel, M.bot, M.drew]}
 
-schedules = dict([(m, [''] * Weeks) for m in M])
+# How much one week of extra spacing between division rematches
+# is worth against one point of strength of schedule spread
+RivalrySpacingWeight = 10.0
+
+# Times a batch schedule backs up before starting over
+# Backing up a couple of weeks now and then can go on for minutes
+ScheduleRetries = 1000
+
+# Attempts a worker gets for each schedule it was asked for
+AttemptsPerSchedule = 20
+
+# Rounds in a row without a new distinct schedule before giving up
+MaxStallRounds = 3
+
+def NewSchedules():
+	return dict([(m, [''] * Weeks) for m in M])
 
 def InSameDivision(team1, team2):
 	return team1 in divisions[D.east] and team2 in divisions[D.east] or \
 		team1 in divisions[D.west] and team2 in divisions[D.west]
 
-def GetNumberOfExistingMatchups(team1, team2):
+def GetNumberOfExistingMatchups(schedules, team1, team2):
 	return schedules[team1].count(team2)
-		
-def HasOpponent(team, week):
+
+def HasOpponent(schedules, team, week):
 	return schedules[team][week] != ''
-		
-def IsValidNewMatchup(team1, team2, week):
-	
-	if HasOpponent(team1, week) or HasOpponent(team2, week):
+
+def IsValidNewMatchup(schedules, team1, team2, week):
+
+	if HasOpponent(schedules, team1, week) or HasOpponent(schedules, team2, week):
 		return False
 
 	if InSameDivision(team1, team2):
-		isValid = GetNumberOfExistingMatchups(team1, team2) < 2
+		isValid = GetNumberOfExistingMatchups(schedules, team1, team2) < 2
 		if isValid:
 			if (week > 0 and schedules[team1][week-1] == team2) or (week > 1 and schedules[team1][week-2] == team2):
 				isValid = False
-			
+
 		return isValid
 	else:
-		return GetNumberOfExistingMatchups(team1, team2) < 1
-		
-	
-def main():
-		
+		return GetNumberOfExistingMatchups(schedules, team1, team2) < 1
+
+# Returns None after retries failed weeks, None for no limit
+def GenerateSchedule(verbose=True, retries=None):
+
+	schedules = NewSchedules()
+
 	week = 0
 	while week < Weeks:
-		print("Generating opponents " + str(week))
-		
+		if verbose:
+			print("Generating opponents " + str(week))
+
 		success = True
-		
+
 		try:
 			for m in M:
-				if HasOpponent(m, week):
+				if HasOpponent(schedules, m, week):
 					continue
-		
+
 				foundOpp = False
 				newOpponnents = set(M)
-				newOpponnents.discard(m)				
+				newOpponnents.discard(m)
 				while not foundOpp:
 
-					newOpp = sample(newOpponnents, 1)[0]
+					newOpp = sample(list(newOpponnents), 1)[0]
 					newOpponnents.discard(newOpp)
-					if IsValidNewMatchup(m, newOpp, week):
+					if IsValidNewMatchup(schedules, m, newOpp, week):
 						schedules[m][week] = newOpp
 						schedules[newOpp][week] = m
 						foundOpp = True
-		except:
+		except ValueError:
+			# Ran out of opponents to sample
 			success = False
-		
-		
+
+
 		if not success:
+			if retries is not None:
+				if retries == 0:
+					return None
+				retries -= 1
+
 			for m in M:
 				schedules[m][week] = ''
 				schedules[m][week-1] = ''
 				schedules[m][week-2] = ''
-			week = week - 2
-			print("trying again")
+			week = max(0, week - 2)
+			if verbose:
+				print("trying again")
 		else:
 			week = week + 1
-	
-	print("\nDouble checking opponents are correct\n")
+
+	return schedules
+
+# Double check that each team plays it's own division members twice,
+# and the other division just once
+def IsValidSchedule(schedules):
 	noFailures = True
-	# Double check that each team plays it's own division members twice,
-	# and the other division just once
 	for m1 in M:
 		for m2 in M:
 			if m1 == m2:
@@ -103,22 +138,213 @@ def main():
 			else:
 				if schedules[m1].count(m2) != 1:
 					noFailures = False
-	
-	if noFailures:
+	return noFailures
+
+def WriteSchedule(f, schedules):
+	for week in range(0, Weeks):
+		f.write("Week " + str(week+1) + "\n")
+		printedMembers = []
+		for m in M:
+			if m not in printedMembers:
+				opp = schedules[m][week]
+				f.write("\t" + m.name + "\t  vs\t" +  opp.name + "\n")
+				printedMembers.append(m)
+				printedMembers.append(opp)
+		f.write("\n\n")
+
+'''
+Batch mode
+
+Worker processes each generate a share of the candidates.
+Candidates are deduplicated by a hash of their canonical form,
+the set of matchups of every week, and all distinct schedules
+are scored in one pass over an opponents matrix.
+'''
+
+# Schedules as weeks of sorted (team, team) value pairs
+def GetCanonicalSchedule(schedules):
+	weeks = []
+	for week in range(Weeks):
+		pairs = set()
+		for m in M:
+			opp = schedules[m][week]
+			pairs.add((min(m.value, opp.value), max(m.value, opp.value)))
+		weeks.append(tuple(sorted(pairs)))
+	return tuple(weeks)
+
+def GetScheduleHash(canonical):
+	return hashlib.sha1(repr(canonical).encode('utf-8')).hexdigest()
+
+# Up to count valid schedules, fewer if the attempts run out
+def GenerateCanonicalSchedules(args):
+	count, workerSeed = args
+	seed(workerSeed)
+
+	canonicals = []
+	for attempt in range(count * AttemptsPerSchedule):
+		if len(canonicals) == count:
+			break
+		schedules = GenerateSchedule(verbose=False, retries=ScheduleRetries)
+		if schedules is not None and IsValidSchedule(schedules):
+			canonicals.append(GetCanonicalSchedule(schedules))
+	return canonicals
+
+# hash -> canonical schedule for up to count distinct schedules
+def GenerateDistinctSchedules(count, processes):
+	distinct = {}
+	pool = Pool(processes)
+
+	# Keep asking for more until enough distinct ones come back
+	# Duplicates are rare so a round usually does it, but stop
+	# once rounds stop turning up new schedules
+	rounds = 0
+	stalled = 0
+	while len(distinct) < count and stalled < MaxStallRounds:
+		missing = count - len(distinct)
+		shares = [ (missing // processes + (1 if i < missing % processes else 0), os.urandom(16)) for i in range(processes) ]
+
+		found = len(distinct)
+		for canonicals in pool.map(GenerateCanonicalSchedules, [ share for share in shares if share[0] > 0 ]):
+			for canonical in canonicals:
+				distinct[GetScheduleHash(canonical)] = canonical
+		stalled = stalled + 1 if len(distinct) == found else 0
+
+		rounds += 1
+		print("Round " + str(rounds) + ": " + str(len(distinct)) + " distinct schedules")
+
+	pool.close()
+	pool.join()
+
+	if len(distinct) < count:
+		print("Only found " + str(len(distinct)) + " of " + str(count) + " distinct schedules, " + str(MaxStallRounds) + " rounds in a row found nothing new")
+	return distinct
+
+# Prior season points per team from a scrape.py standings.csv
+# The owner's first name is matched against team names
+def LoadPriorPoints(filename):
+	points = [0.0] * len(M)
+	with open(filename, "r") as f:
+		for row in csv.reader(f):
+			name = row[0].split()[0].lower()
+			if name in M.__members__:
+				points[M[name].value] = float(row[4])
+	return points
+
+#
+# Score every schedule, lower is fairer
+#
+# opponents is a flat schedules x teams x weeks array of team values
+# and opponentPoints the same array of their prior points, so a team's
+# season in one schedule is a single slice of either.
+# Scoring stays one schedule at a time: without numpy, working on
+# whole columns across schedules with map was several times slower.
+# Strength of schedule for a team is the sum of its opponents' prior
+# points and its spread is the standard deviation across teams.
+# Rivalry spacing is the mean number of weeks between division rematches.
+#
+def ScoreSchedules(canonicals, priorPoints):
+	teams = len(M)
+	stride = teams * Weeks
+
+	opponents = array('b', [0]) * (len(canonicals) * stride)
+	for index,canonical in enumerate(canonicals):
+		base = index * stride
+		for week,pairs in enumerate(canonical):
+			for team1,team2 in pairs:
+				opponents[base + team1 * Weeks + week] = team2
+				opponents[base + team2 * Weeks + week] = team1
+
+	opponentPoints = array('d', [ priorPoints[opp] for opp in opponents ])
+
+	scores = []
+	for index in range(len(canonicals)):
+		base = index * stride
+
+		strengths = [ sum(opponentPoints[base + team * Weeks : base + (team+1) * Weeks]) for team in range(teams) ]
+		mean = sum(strengths) / teams
+		spread = math.sqrt(sum([ (strength - mean) ** 2 for strength in strengths ]) / teams)
+
+		gaps = []
+		for team in range(teams):
+			row = opponents[base + team * Weeks : base + (team+1) * Weeks].tolist()
+			for opp in set(row):
+				if opp > team and row.count(opp) == 2:
+					first = row.index(opp)
+					gaps.append(row.index(opp, first+1) - first)
+		spacing = float(sum(gaps)) / max(1, len(gaps))
+
+		scores.append((spread - RivalrySpacingWeight * spacing, spread, spacing))
+
+	return scores
+
+def FromCanonical(canonical):
+	schedules = NewSchedules()
+	for week,pairs in enumerate(canonical):
+		for team1,team2 in pairs:
+			schedules[M(team1)][week] = M(team2)
+			schedules[M(team2)][week] = M(team1)
+	return schedules
+
+def RunBatch(count, top, processes, priorPointsFile):
+	distinct = GenerateDistinctSchedules(count, processes)
+
+	priorPoints = [0.0] * len(M)
+	if priorPointsFile is not None:
+		priorPoints = LoadPriorPoints(priorPointsFile)
+
+	hashes = sorted(distinct)
+	canonicals = [ distinct[scheduleHash] for scheduleHash in hashes ]
+	scores = ScoreSchedules(canonicals, priorPoints)
+
+	ranked = sorted(range(len(canonicals)), key=lambda index: scores[index][0])[:top]
+
+	f = open("schedules.txt", "w")
+	for rank,index in enumerate(ranked):
+		score, spread, spacing = scores[index]
+		f.write("Schedule " + str(rank+1) + " " + hashes[index] + "\n")
+		f.write("Score " + str(round(score, 2)) + "\tstrength of schedule spread " + str(round(spread, 2)) + "\tmean rematch spacing " + str(round(spacing, 2)) + "\n\n")
+		WriteSchedule(f, FromCanonical(canonicals[index]))
+	f.close()
+	print("Top " + str(len(ranked)) + " of " + str(len(canonicals)) + " schedules written to file")
+
+def main(argv):
+
+	try:
+		opts, args = getopt.getopt(argv, "n:k:p:s:")
+	except getopt.GetoptError:
+		print("gen-schedules.py -n [number of schedules] -k [number to keep] -p [processes] -s [prior season standings.csv]")
+		sys.exit(2)
+
+	count = 1
+	top = 10
+	processes = os.cpu_count() if hasattr(os, "cpu_count") else 1
+	priorPointsFile = None
+	for opt, arg in opts:
+		if opt == '-n':
+			count = int(arg)
+		elif opt == '-k':
+			top = int(arg)
+		elif opt == '-p':
+			processes = int(arg)
+		elif opt == '-s':
+			priorPointsFile = arg
+
+	if count > 1:
+		RunBatch(count, top, processes, priorPointsFile)
+		return
+
+	schedules = GenerateSchedule()
+
+	print("\nDouble checking opponents are correct\n")
+
+	if IsValidSchedule(schedules):
 		f = open("schedules.txt", "w")
-		for week in range(0, Weeks):
-			f.write("Week " + str(week+1) + "\n")
-			printedMembers = []
-			for m in M:
-				if m not in printedMembers:
-					opp = schedules[m][week]
-					f.write("\t" + m.name + "\t  vs\t" +  opp.name + "\n")
-					printedMembers.append(m)
-					printedMembers.append(opp)
-			f.write("\n\n")
+		WriteSchedule(f, schedules)
+		f.close()
 		print("Success schedule written to file")
 	else:
 		print("Failures have been found")
 		print(schedules)
-	
-main()
\ No newline at end of file
+
+if __name__ == '__main__':
+	main(sys.argv[1:])
@@ -0,0 +1,224 @@
+import getopt
+import hashlib
+import json
+import requests
+import sys
+import time
+
+import scrape
+
+'''
+Live game day mode
+
+Polls the current week's boxscore quick pages and republishes
+'optimal vs actual' numbers whenever a page changes.
+
+Draft and projection data and the roster slots come from the season
+snapshot and the week's pages come from the boxscore manifest, so nothing but the current week's
+boxscores is ever requested. Requests are conditional (ETag and
+Last-Modified), go through scrape.FetchPage's retries and are cached
+compacted like any other download. Only pages whose compacted content
+changed are parsed again.
+
+The snapshot must hold the weeks before the live one. Standings are the
+snapshot's plus the live week's matchups as they stand, so every change
+is written as one json line holding the matchup's new numbers along with
+both owners' refreshed standings.
+'''
+
+DefaultPollInterval = 60
+
+# State for one matchup page between polls
+class LivePage:
+	def __init__(self, entry):
+		self.entry = entry
+		self.etag = None
+		self.lastModified = None
+
+		# Unknown until the first poll, so the first poll always publishes
+		self.sha1 = None
+
+		# owner -> numbers from the last time the page changed
+		self.summary = {}
+
+		# Results of the last parse, None before the first one
+		self.results = None
+
+	def Headers(self):
+		headers = {}
+		if self.etag is not None:
+			headers["If-None-Match"] = self.etag
+		if self.lastModified is not None:
+			headers["If-Modified-Since"] = self.lastModified
+		return headers
+
+#
+# Fetch the page if it changed since the last poll
+# Returns the new content or None
+#
+def PollPage(session, page):
+	response = scrape.FetchPage(page.entry["url"], page.Headers(), session)
+	if response.status_code == 304:
+		return None
+
+	page.etag = response.headers.get("ETag", page.etag)
+	page.lastModified = response.headers.get("Last-Modified", page.lastModified)
+
+	# Compacted first so changes to ads and scripts don't count
+	content = scrape.CompactPage("boxscores", response.content)
+	sha1 = hashlib.sha1(content).hexdigest()
+	if sha1 == page.sha1:
+		return None
+
+	page.sha1 = sha1
+	page.entry["sha1"] = sha1
+	scrape.CachePage("boxscores", page.entry["file"], content)
+
+	return content
+
+#
+# Parse one matchup page into a scratch Results sharing
+# players, draft and projections with the season
+#
+def ParseLivePage(season, content, week):
+	results = scrape.Results()
+	results.year = season.year
+	results.players = season.players
+	results.playerDraftMap = season.playerDraftMap
+	results.projections = season.projections
+	results.divisions = season.divisions
+	results.InitializeWithOwners()
+
+	scrape.ParseStatsPage(content, results, week=str(week))
+	return results
+
+# Season standing of owner in group ('standings' or 'standingsOptimal')
+# with the live week's matchups as they stand
+def GetLiveStanding(season, pages, group, owner):
+	standing = scrape.Standing()
+	for results in [season] + [ page.results for page in pages if page.results is not None ]:
+		weekStanding = getattr(results, group)[owner]
+		standing.wins += weekStanding.wins
+		standing.losses += weekStanding.losses
+		standing.ties += weekStanding.ties
+		standing.points += weekStanding.points
+	return standing
+
+def FormatStanding(standing):
+	return {
+		"record" : str(standing.wins) + "-" + str(standing.losses) + "-" + str(standing.ties),
+		"points" : scrape.FormatPoints(standing.points)
+	}
+
+# owner -> numbers published for that owner's side of the matchup
+def Summarize(season, pages, results):
+	owners = set(row.owner for row in results.playerData)
+
+	summary = {}
+	for owner in owners:
+		actual = results.standings[owner].points
+		optimal = results.standingsOptimal[owner].points
+		summary[owner] = {
+			"standings" : FormatStanding(GetLiveStanding(season, pages, "standings", owner)),
+			"standingsOptimal" : FormatStanding(GetLiveStanding(season, pages, "standingsOptimal", owner)),
+			"points" : scrape.FormatPoints(actual),
+			"optimalPoints" : scrape.FormatPoints(optimal),
+			"pointsLeftOnBench" : scrape.FormatPoints(optimal - actual),
+			"wrongDecisions" : len([ decision for decision in results.wrongDecisionsOptimal if decision.owner == owner ]),
+			"projectionUpsets" : len([ decision for decision in results.projectionUpsetDecisions if decision.owner == owner ])
+		}
+	return summary
+
+#
+# Poll every page of the week until count polls are done (forever if None)
+#
+def Run(season, manifest, week, interval, out, count=None):
+	pages = [ LivePage(entry) for entry in manifest if entry["week"] == week ]
+	if len(pages) == 0:
+		print("No boxscores found for week " + str(week))
+		return
+
+	session = requests.Session()
+	polls = 0
+	while count is None or polls < count:
+		pollStart = time.time()
+
+		for page in pages:
+			try:
+				content = PollPage(session, page)
+			except requests.exceptions.RequestException as e:
+				print("Failed to poll " + page.entry["file"] + ": " + str(e))
+				continue
+
+			if content is None:
+				continue
+
+			received = time.time()
+			page.results = ParseLivePage(season, content, week)
+			summary = Summarize(season, pages, page.results)
+
+			delta = {}
+			for owner in summary:
+				if summary[owner] != page.summary.get(owner):
+					delta[owner] = summary[owner]
+			page.summary = summary
+
+			if len(delta) == 0:
+				continue
+
+			out.write(json.dumps({
+				"week" : week,
+				"file" : page.entry["file"],
+				"time" : received,
+				"owners" : delta,
+				"latencyMs" : round((time.time() - received) * 1000, 1)
+			}, sort_keys=True) + "\n")
+			out.flush()
+
+		scrape.WriteBoxscoreManifest('boxscores', manifest)
+
+		polls += 1
+		if count is None or polls < count:
+			time.sleep(max(0, interval - (time.time() - pollStart)))
+
+def main(argv):
+	try:
+		opts, args = getopt.getopt(argv, "w:i:l:o:c:")
+	except getopt.GetoptError:
+		print("live.py -w [week] -i [poll interval seconds] -l [season snapshot] -o [deltas file] -c [number of polls]")
+		sys.exit(2)
+
+	week = None
+	interval = DefaultPollInterval
+	snapshotFile = scrape.SeasonSnapshotFile
+	out = sys.stdout
+	count = None
+	for opt, arg in opts:
+		if opt == '-w':
+			week = int(arg)
+		elif opt == '-i':
+			interval = float(arg)
+		elif opt == '-l':
+			snapshotFile = arg
+		elif opt == '-o':
+			out = open(arg, "a")
+		elif opt == '-c':
+			count = int(arg)
+
+	if week is None:
+		print("live.py needs the current week, use -w")
+		sys.exit(2)
+
+	season = scrape.LoadResults(snapshotFile)
+	if any(int(row.week) >= week for row in season.playerData):
+		print(snapshotFile + " already holds week " + str(week) + ", rebuild it with scrape.py -w 1-" + str(week-1))
+		sys.exit(2)
+
+	manifest = scrape.LoadBoxscoreManifest('boxscores')
+	if manifest is None:
+		manifest = scrape.ParseSchedule(season)
+
+	Run(season, manifest, week, interval, out, count)
+
+if __name__ == '__main__':
+	main(sys.argv[1:])
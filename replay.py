@@ -0,0 +1,247 @@
+import getopt
+import os
+import random
+import sys
+import threading
+import time
+
+try:
+	from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+	from SocketServer import ThreadingMixIn
+	from urlparse import urlparse, parse_qs
+except ImportError:
+	from http.server import BaseHTTPRequestHandler, HTTPServer
+	from socketserver import ThreadingMixIn
+	from urllib.parse import urlparse, parse_qs
+
+import scrape
+
+'''
+Replay server
+
+Serves a recorded cache (a directory holding the draft, divisions,
+schedules, waivers, projections and boxscores caches scrape.py writes)
+under the same url shapes espn uses, so scrape.py -u pointed at it runs
+every network code path without touching espn.
+
+Latency, bandwidth, error rate and throttling can be set to see how
+fetching holds up against a slow or unreliable espn.
+'''
+
+DefaultPort = 8000
+
+# Bytes written at once when the bandwidth is limited
+SendChunkSize = 4096
+
+# Seconds a throttled client is told to wait
+ThrottleRetryAfter = 1
+
+#
+# Boxscore pages by (teamId, week), both as strings
+# The manifest is used when the cache has one, otherwise the schedule
+# is parsed like scrape.py does before downloading boxscores.
+#
+def BuildBoxscoreIndex(root):
+	manifest = scrape.LoadBoxscoreManifest(os.path.join(root, 'boxscores'))
+	if manifest is None:
+		schedulePath = os.path.join(root, 'schedules', 'schedules.html')
+		if not os.path.exists(schedulePath):
+			return {}
+		with open(schedulePath, "rb") as f:
+			manifest = scrape.ParseScheduleContent(f.read(), scrape.Results())
+
+	index = {}
+	for entry in manifest:
+		for teamId in entry["teamIds"]:
+			index[(str(teamId), str(entry["week"]))] = os.path.join('boxscores', entry["file"])
+	return index
+
+# Cache file for a request path and its query relative to the served
+# directory, None if there isn't one
+def GetCacheFile(path, query, boxscores):
+	def arg(name):
+		return query.get(name, [""])[0]
+
+	if path == "/ffl/tools/draftrecap":
+		return os.path.join('draft', 'draft.html')
+	if path == "/ffl/standings":
+		return os.path.join('divisions', 'divisions.html')
+	if path == "/ffl/schedule":
+		return os.path.join('schedules', 'schedules.html')
+	if path == "/ffl/waiverreport":
+		if arg("date") == "":
+			return os.path.join('waivers', 'defaultwaivers.html')
+		return os.path.join('waivers', "waiver_" + arg("date") + ".html")
+	if path == "/ffl/tools/projections":
+		if not arg("startIndex").isdigit():
+			return None
+		page = int(arg("startIndex")) // 40
+		return os.path.join('projections', arg("scoringPeriodId") + "_" + arg("slotCategoryId") + "_" + str(page) + ".html")
+	if path == "/ffl/boxscorequick":
+		return boxscores.get((arg("teamId"), arg("scoringPeriodId")))
+	return None
+
+#
+# Counts of what the server did, shared by all request threads
+#
+class ReplayStats:
+	def __init__(self):
+		self.lock = threading.Lock()
+		self.counts = {"requests" : 0, "served" : 0, "bytes" : 0, "throttled" : 0, "errors" : 0, "missing" : 0}
+
+	def Add(self, name, amount=1):
+		with self.lock:
+			self.counts[name] += amount
+
+	def Summary(self):
+		with self.lock:
+			return ", ".join([ name + " " + str(self.counts[name]) for name in sorted(self.counts) ])
+
+class ReplayServer(ThreadingMixIn, HTTPServer):
+	daemon_threads = True
+
+	#
+	# latency is seconds added to every response
+	# bandwidth is bytes per second for each response, 0 for no limit
+	# errorRate is the chance a request gets a 503
+	# rateLimit is requests per second over all clients before
+	# requests get a 429, 0 for no limit
+	# files are served from root, the process's directory is left alone
+	#
+	def __init__(self, address, root, latency=0, bandwidth=0, errorRate=0, rateLimit=0):
+		HTTPServer.__init__(self, address, ReplayHandler)
+		self.root = os.path.abspath(root)
+		self.latency = latency
+		self.bandwidth = bandwidth
+		self.errorRate = errorRate
+		self.rateLimit = rateLimit
+		self.stats = ReplayStats()
+		self.boxscores = BuildBoxscoreIndex(self.root)
+
+		# Token bucket holding up to one second of requests
+		self.bucketLock = threading.Lock()
+		self.tokens = float(rateLimit)
+		self.lastRefill = time.time()
+
+	# False when the request is over the rate limit
+	def TakeToken(self):
+		if self.rateLimit <= 0:
+			return True
+
+		with self.bucketLock:
+			now = time.time()
+			self.tokens = min(float(self.rateLimit), self.tokens + (now - self.lastRefill) * self.rateLimit)
+			self.lastRefill = now
+			if self.tokens < 1:
+				return False
+			self.tokens -= 1
+			return True
+
+class ReplayHandler(BaseHTTPRequestHandler):
+
+	def do_GET(self):
+		server = self.server
+		server.stats.Add("requests")
+
+		if not server.TakeToken():
+			server.stats.Add("throttled")
+			self.send_response(429)
+			self.send_header("Retry-After", str(ThrottleRetryAfter))
+			self.end_headers()
+			return
+
+		if server.latency > 0:
+			time.sleep(server.latency)
+
+		if random.random() < server.errorRate:
+			server.stats.Add("errors")
+			self.send_error(503)
+			return
+
+		url = urlparse(self.path)
+		filepath = GetCacheFile(url.path, parse_qs(url.query), server.boxscores)
+		if filepath is not None:
+			filepath = os.path.join(server.root, filepath)
+		if filepath is None or not os.path.exists(filepath):
+			server.stats.Add("missing")
+			self.send_error(404)
+			return
+
+		with open(filepath, "rb") as f:
+			content = f.read()
+
+		self.send_response(200)
+		self.send_header("Content-Type", "text/html; charset=utf-8")
+		self.send_header("Content-Length", str(len(content)))
+		self.end_headers()
+
+		if server.bandwidth <= 0:
+			self.wfile.write(content)
+		else:
+			for start in range(0, len(content), SendChunkSize):
+				chunk = content[start:start+SendChunkSize]
+				self.wfile.write(chunk)
+				time.sleep(float(len(chunk)) / server.bandwidth)
+
+		server.stats.Add("served")
+		server.stats.Add("bytes", len(content))
+
+	# Requests are counted in the stats instead
+	def log_message(self, format, *args):
+		pass
+
+#
+# Serve root on a background thread and return the server
+# port 0 picks any free port, see server.server_address
+#
+def StartReplayServer(root, port=0, latency=0, bandwidth=0, errorRate=0, rateLimit=0):
+	server = ReplayServer(("127.0.0.1", port), root, latency, bandwidth, errorRate, rateLimit)
+
+	thread = threading.Thread(target=server.serve_forever)
+	thread.daemon = True
+	thread.start()
+	return server
+
+def GetServerHost(server):
+	return "http://127.0.0.1:" + str(server.server_address[1])
+
+def main(argv):
+	try:
+		opts, args = getopt.getopt(argv, "d:p:l:b:e:t:")
+	except getopt.GetoptError:
+		print("replay.py -d [recorded cache directory] -p [port] -l [latency ms] -b [bandwidth KB/s] -e [error rate like 0.05] -t [requests per second before 429s]")
+		sys.exit(2)
+
+	root = "."
+	port = DefaultPort
+	latency = 0
+	bandwidth = 0
+	errorRate = 0
+	rateLimit = 0
+	for opt, arg in opts:
+		if opt == '-d':
+			root = arg
+		elif opt == '-p':
+			port = int(arg)
+		elif opt == '-l':
+			latency = float(arg) / 1000
+		elif opt == '-b':
+			bandwidth = float(arg) * 1024
+		elif opt == '-e':
+			errorRate = float(arg)
+		elif opt == '-t':
+			rateLimit = float(arg)
+
+	server = StartReplayServer(root, port, latency, bandwidth, errorRate, rateLimit)
+	print("Replaying " + server.root + " on " + GetServerHost(server) + ", " + str(len(server.boxscores)) + " boxscore pages")
+	print("Run scrape.py -u " + GetServerHost(server))
+
+	try:
+		while True:
+			time.sleep(10)
+			print(server.stats.Summary())
+	except KeyboardInterrupt:
+		print(server.stats.Summary())
+
+if __name__ == '__main__':
+	main(sys.argv[1:])
@@ -1,43 +1,214 @@
 from bs4 import BeautifulSoup
 from decimal import Decimal
 from itertools import chain
+import array
+import bisect
+import copy
 import csv
+import datetime
+import extract
 import getopt
-import glob
+import hashlib
+import json
+import math
 import os
+import random
 import requests
+import snapshot
 import subprocess
 import sys
+import threading
+import time
+import traceback
 
-# List of urls used to download files
-DraftUrl = "http://games.espn.com/ffl/tools/draftrecap?leagueId=524258&year={}"
-StandingsUrl = "http://games.espn.go.com/ffl/standings?leagueId=524258&seasonId={}"
-ScheduleUrl = "http://games.espn.com/ffl/schedule?leagueId=524258"
-BoxScoreQuickUrl = "http://games.espn.com/ffl/boxscorequick?leagueId=524258&teamId={}&scoringPeriodId={}&seasonId={}&view=scoringperiod&version=quick"
-DefaultWaiverReportUrl = "http://games.espn.com/ffl/waiverreport?leagueId=524258"
-DateWaiverReportUrl = "http://games.espn.com/ffl/waiverreport?leagueId=524258&date={}"
-ProjectionsUrl = "http://games.espn.com/ffl/tools/projections?&scoringPeriodId={}&seasonId={}&leagueId=524258&startIndex={}&slotCategoryId={}"
+try:
+	import Queue as queue
+except ImportError:
+	import queue
 
-def GetBoxScoreQuickUrl(teamId, scoringPeriodId, year):
-	return BoxScoreQuickUrl.format(teamId, scoringPeriodId, year)
+# Our league, others are given with -i
+DefaultLeagueId = "524258"
 
-def GetStandingsUrl(year):
-	return StandingsUrl.format(year)
+# Hosts pages are downloaded from, see SetEspnHost
+EspnHost = "http://games.espn.com"
+EspnGoHost = "http://games.espn.go.com"
 
-def GetDraftUrl(year):
-	return DraftUrl.format(year)
+# List of urls used to download files, the first field is the host
+DraftUrl = "{}/ffl/tools/draftrecap?leagueId={}&year={}"
+StandingsUrl = "{}/ffl/standings?leagueId={}&seasonId={}"
+ScheduleUrl = "{}/ffl/schedule?leagueId={}&seasonId={}"
+BoxScoreQuickUrl = "{}/ffl/boxscorequick?leagueId={}&teamId={}&scoringPeriodId={}&seasonId={}&view=scoringperiod&version=quick"
+DefaultWaiverReportUrl = "{}/ffl/waiverreport?leagueId={}&seasonId={}"
+DateWaiverReportUrl = "{}/ffl/waiverreport?leagueId={}&seasonId={}&date={}"
+ProjectionsUrl = "{}/ffl/tools/projections?&scoringPeriodId={}&seasonId={}&leagueId={}&startIndex={}&slotCategoryId={}"
+
+# Download every page from one host instead, like a replay.py server
+# host is given like 'http://localhost:8000'
+def SetEspnHost(host):
+	global EspnHost, EspnGoHost
+	EspnHost = host.rstrip('/')
+	EspnGoHost = EspnHost
+
+def GetBoxScoreQuickUrl(leagueId, teamId, scoringPeriodId, year):
+	return BoxScoreQuickUrl.format(EspnHost, leagueId, teamId, scoringPeriodId, year)
+
+def GetStandingsUrl(leagueId, year):
+	return StandingsUrl.format(EspnGoHost, leagueId, year)
+
+def GetDraftUrl(leagueId, year):
+	return DraftUrl.format(EspnHost, leagueId, year)
+
+def GetScheduleUrl(leagueId, year):
+	return ScheduleUrl.format(EspnHost, leagueId, year)
+
+def GetDefaultWaiverReportUrl(leagueId, year):
+	return DefaultWaiverReportUrl.format(EspnHost, leagueId, year)
 
 # date expected in format 'yyyymmdd'
-def GetWaiverReportForDateUrl(date):
-	return DateWaiverReportUrl.format(date)
+def GetWaiverReportForDateUrl(leagueId, year, date):
+	return DateWaiverReportUrl.format(EspnHost, leagueId, year, date)
 
 # scoringPeriodId is 1-based
 # slotCategory. QB is 0. RB/WR is 3. TE is 6. Def is 16. 
 # page is 0-based
 # Espn grabs players by the 40
 # so page*40 gives us the correct startindex
-def GetProjectionsUrl(scoringPeriodId, year, page, slotCategoryId):
-	return ProjectionsUrl.format(scoringPeriodId, year, str(page*40), slotCategoryId)
+def GetProjectionsUrl(leagueId, scoringPeriodId, year, page, slotCategoryId):
+	return ProjectionsUrl.format(EspnHost, scoringPeriodId, year, leagueId, str(page*40), slotCategoryId)
+
+'''
+Cache compaction
+
+Cached espn pages are mostly navigation, scripts and ads.
+Only the fragments the parsers read are kept, wrapped in a bare page,
+so parsing a compacted page gives exactly what the full page gave.
+A page missing a required fragment is kept whole.
+'''
+CompactMarker = b"<!-- compacted -->"
+
+# Compact pages as they get downloaded
+CompactOnWrite = True
+
+# cache directory -> list of (tag, class, every match or just the first, required)
+# Matches inside another kept fragment come along with it
+CompactFragments = {
+	"boxscores" : [
+		("div", "games-pageheader", False, True),
+		("table", "playerTableTable", True, True),
+		("div", "teamInfoOwnerData", True, True)
+	],
+	"projections" : [("table", "tableBody", False, True)],
+	"waivers" : [
+		("select", None, False, False),
+		("table", "tableBody", False, False)
+	],
+	"divisions" : [("div", "games-fullcol", False, True)],
+	"schedules" : [("table", "tableBody", True, True)]
+}
+
+def IsCompacted(content):
+	return content.startswith(CompactMarker)
+
+# Returns content unchanged for other directories and pages already compacted
+def CompactPage(directory, content):
+	fragments = CompactFragments.get(os.path.basename(os.path.normpath(directory)))
+	if fragments is None or IsCompacted(content):
+		return content
+
+	soup = BeautifulSoup(content, 'html.parser')
+
+	kept = []
+	for name, className, every, required in fragments:
+		attrs = {}
+		if className is not None:
+			attrs["class_"] = className
+
+		if every:
+			tags = soup.find_all(name, **attrs)
+		else:
+			tags = [ tag for tag in [soup.find(name, **attrs)] if tag is not None ]
+
+		if required and len(tags) == 0:
+			return content
+		kept += tags
+
+	keptIds = set([ id(tag) for tag in kept ])
+	kept = [ tag for tag in kept if not any(id(parent) in keptIds for parent in tag.parents) ]
+
+	return CompactMarker + b"<html><body>" + b"".join([ tag.encode('utf-8') for tag in kept ]) + b"</body></html>"
+
+# Parse boxscore, projection and waiver pages with the streaming
+# extractors in extract.py instead of building a BeautifulSoup tree
+UseStreamingExtractors = True
+
+# Attempts at one page before giving up on it
+FetchAttempts = 5
+
+# Seconds to wait after the first failed attempt, doubled after every other one
+FetchBackoff = 0.5
+
+# Seconds one request may take
+FetchTimeout = 30
+
+# Responses worth another attempt, espn throttles with 429
+RetryStatusCodes = [429, 500, 502, 503, 504]
+
+#
+# Request one page, retrying connection errors and the responses
+# in RetryStatusCodes with jittered exponential backoff.
+# A Retry-After header is waited out when it asks for longer.
+# Raises once every attempt failed or for any other error status.
+#
+# headers are sent with every attempt and session (a requests.Session)
+# keeps connections open between calls. Returns the response.
+#
+def FetchPage(url, headers=None, session=None):
+	if session is None:
+		session = requests
+
+	delay = FetchBackoff
+	for attempt in range(FetchAttempts):
+		isLastAttempt = attempt == FetchAttempts - 1
+
+		try:
+			response = session.get(url, headers=headers, timeout=FetchTimeout)
+		except requests.exceptions.RequestException:
+			if isLastAttempt:
+				raise
+			response = None
+
+		wait = delay
+		if response is not None:
+			if response.status_code not in RetryStatusCodes or isLastAttempt:
+				response.raise_for_status()
+				return response
+
+			retryAfter = response.headers.get("Retry-After", "")
+			if retryAfter.isdigit():
+				wait = max(wait, float(retryAfter))
+
+		# Jitter keeps the fetch workers from retrying in lockstep
+		time.sleep(wait * random.uniform(1, 1.5))
+		delay *= 2
+
+def DownloadPage(url):
+	return FetchPage(url).content
+
+#
+# Cache a downloaded page, compacted when CompactOnWrite is set
+# Returns the content as cached
+#
+def CachePage(directory, filename, content):
+	if CompactOnWrite:
+		content = CompactPage(directory, content)
+
+	# Write next to the page first so a crash never leaves half a page
+	filepath = directory + "/" + filename
+	with open(filepath + ".tmp", 'wb') as f:
+		f.write(content)
+	os.rename(filepath + ".tmp", filepath)
+
+	return content
 
 def LoadContent(url, directory, proposedFileName):
 
@@ -45,19 +216,297 @@ def LoadContent(url, directory, proposedFileName):
 	content = None
 
 	if not os.path.exists(filepath):
-		content = requests.get(url).content
-		with open(filepath, 'wb') as f:
-			f.write(content)
+		content = CachePage(directory, proposedFileName, DownloadPage(url))
 	else:
 		content = open(filepath, "r").read()
 
 	return content
 
+# Number of threads downloading pages for one stage
+FetchWorkers = 4
+
+# Most fetched pages waiting to be parsed
+PageQueueSize = 16
+
+#
+# Download pages on FetchWorkers threads while parsing them on this one.
+#
+# jobs is a list of (url, directory, filename, context).
+# parse(content, context) is called for each page in job order,
+# so parsing overlaps with the network without reordering results.
+# A worker takes a slot before it takes a job and the slot is given
+# back once that page is parsed, so at most PageQueueSize pages are
+# held in memory however far the fetches run ahead of the parser.
+# Jobs are taken in order, so the page the parser waits for
+# always has a slot and can't be starved by later ones.
+#
+# With a checkpoint, pages it already parsed are skipped and pages
+# that fail are quarantined instead of raised, see Checkpoint.
+#
+def FetchAndParse(jobs, parse, checkpoint=None):
+	if checkpoint is not None:
+		jobs = [ job for job in jobs if not checkpoint.IsPageDone(job) ]
+
+	jobQueue = queue.Queue()
+	for index,job in enumerate(jobs):
+		jobQueue.put((index, job))
+
+	pageQueue = queue.Queue(PageQueueSize)
+	slots = threading.Semaphore(PageQueueSize)
+
+	def fetch():
+		while True:
+			slots.acquire()
+			try:
+				index, job = jobQueue.get_nowait()
+			except queue.Empty:
+				slots.release()
+				return
+
+			try:
+				content = LoadContent(job[0], job[1], job[2])
+			except Exception as e:
+				content = e
+			pageQueue.put((index, content))
+
+	for i in range(min(FetchWorkers, len(jobs))):
+		worker = threading.Thread(target=fetch)
+		worker.daemon = True
+		worker.start()
+
+	# Pages can arrive out of order, hold on to them until their turn
+	fetched = {}
+	for index in range(len(jobs)):
+		while index not in fetched:
+			fetchedIndex, content = pageQueue.get()
+			fetched[fetchedIndex] = content
+
+		content = fetched.pop(index)
+		try:
+			if checkpoint is not None:
+				checkpoint.ParsePage(jobs[index], content, parse)
+				continue
+
+			if isinstance(content, Exception):
+				raise content
+
+			parse(content, jobs[index][3])
+		finally:
+			slots.release()
+
+#
+# Load a page the jobs for other pages come from, like the
+# waiver report dates or the schedule, and return parse(content, context).
+# What it gives isn't kept in Results so it is parsed again on every run.
+#
+# With a checkpoint a page that fails is quarantined like any other,
+# leaving its stage unfinished, and None is returned.
+#
+def LoadIndexPage(job, parse, checkpoint=None):
+	if checkpoint is None:
+		return parse(LoadContent(job[0], job[1], job[2]), job[3])
+
+	try:
+		content = LoadContent(job[0], job[1], job[2])
+	except Exception as e:
+		content = e
+
+	parsed = []
+	checkpoint.ParsePage(job, content, lambda content, context: parsed.append(parse(content, context)))
+	if len(parsed) == 0:
+		return None
+	return parsed[0]
+
+#
+# Runs one loader on its own thread
+# Wait re-raises anything the loader raised
+#
+class Stage(threading.Thread):
+	def __init__(self, function, *args):
+		threading.Thread.__init__(self)
+		self.daemon = True
+		self.function = function
+		self.args = args
+		self.error = None
+		self.start()
+
+	def run(self):
+		try:
+			self.function(*self.args)
+		except Exception as e:
+			traceback.print_exc()
+			self.error = e
+
+	def Wait(self):
+		self.join()
+		if self.error is not None:
+			raise self.error
+
+'''
+Checkpoints
+
+A long run keeps partial Results in a snapshot (see SaveResults) along
+with the stages and pages already parsed into it, so scrape.py --resume
+carries on from there after a crash instead of starting over.
+
+Parsing a page and saving both hold the checkpoint lock, so a saved
+checkpoint always holds exactly the pages it lists. It is saved after
+every stage and at most every CheckpointInterval seconds in between.
+
+A page that fails to download or parse is quarantined to ErrorLogFile
+and the stage goes on with its other pages. Whatever a failed parse
+added to Results is rolled back, see Results.Mark, and the page is left
+unparsed and its stage unfinished so a resumed run tries it again.
+Stages that need an unfinished stage don't run, main stops after saving
+the checkpoint instead.
+
+A checkpoint only resumes the weeks it was started with.
+'''
+CheckpointFile = "results/checkpoint.snap"
+ErrorLogFile = "results/errors.log"
+
+# Seconds between checkpoints within a stage
+CheckpointInterval = 30
+
+# Key of a FetchAndParse job in the parsed pages
+def GetPageKey(job):
+	return job[1] + "/" + job[2]
+
+class Checkpoint:
+	def __init__(self, path, results):
+		self.path = path
+		self.results = results
+		self.lock = threading.RLock()
+		self.lastSave = time.time()
+
+		# Names of finished stages and keys of parsed pages
+		self.stages = set()
+		self.pages = set()
+
+		# Boxscore weeks of the run like '1-9', "" for all of them
+		self.weeks = ""
+
+		# Pages quarantined during this run
+		self.failures = 0
+
+		# Pages the current thread's stage failed to download or parse
+		self.local = threading.local()
+
+	def IsPageDone(self, job):
+		return GetPageKey(job) in self.pages
+
+	def IsStageDone(self, name):
+		with self.lock:
+			return name in self.stages
+
+	# content is the exception when the page failed to download
+	def ParsePage(self, job, content, parse):
+		with self.lock:
+			if isinstance(content, Exception):
+				self.Quarantine(job, "download failed: " + repr(content) + "\n")
+				return
+
+			mark = self.results.Mark()
+			try:
+				parse(content, job[3])
+			except Exception:
+				self.results.Rollback(mark)
+				self.Quarantine(job, traceback.format_exc())
+				return
+
+			self.pages.add(GetPageKey(job))
+			if time.time() - self.lastSave >= CheckpointInterval:
+				self.Save()
+
+	# Log the page and keep its stage from finishing
+	def Quarantine(self, job, details):
+		self.failures += 1
+		print("Quarantined " + GetPageKey(job) + ", see " + ErrorLogFile)
+		with open(ErrorLogFile, "a") as f:
+			f.write(datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S") + " " + GetPageKey(job) + " " + str(job[0]) + "\n" + details + "\n")
+
+		unfinished = getattr(self.local, "unfinished", None)
+		if unfinished is not None:
+			unfinished.append(GetPageKey(job))
+
+	#
+	# Run function(*args) unless a resumed run already finished it
+	# The stage only counts as finished when every page was parsed
+	# Returns whether it is finished
+	#
+	def RunStage(self, name, function, *args):
+		if self.IsStageDone(name):
+			print("Skipping finished stage " + name)
+			return True
+
+		self.local.unfinished = []
+		function(*args)
+
+		with self.lock:
+			if len(self.local.unfinished) == 0:
+				self.stages.add(name)
+			else:
+				print("Stage " + name + " is unfinished, " + str(len(self.local.unfinished)) + " pages were quarantined")
+			self.Save()
+			return name in self.stages
+
+	def Save(self):
+		with self.lock:
+			keys = [ ("weeks", self.weeks) ] + [ ("stage", stage) for stage in sorted(self.stages) ] + [ ("page", page) for page in sorted(self.pages) ]
+			table = ("checkpoint", [("kind", [ key[0] for key in keys ]), ("key", [ key[1] for key in keys ])])
+
+			# Written next to the last one first so a crash never leaves half a checkpoint
+			SaveResults(self.results, self.path + ".tmp", [table])
+			os.rename(self.path + ".tmp", self.path)
+			self.lastSave = time.time()
+
+# Checkpoint and its Results as last saved to path
+def LoadCheckpoint(path):
+	checkpoint = Checkpoint(path, LoadResults(path))
+
+	snap = snapshot.Snapshot(path)
+	if snap.HasTable("checkpoint"):
+		columns = dict(snap.Columns("checkpoint"))
+		for kind, key in zip(columns["kind"], columns["key"]):
+			if kind == "weeks":
+				checkpoint.weeks = key
+			elif kind == "stage":
+				checkpoint.stages.add(key)
+			else:
+				checkpoint.pages.add(key)
+	snap.Close()
+
+	return checkpoint
+
+'''
+Points and projections are kept as integer hundredths from the moment
+they are parsed, so sums are exact and equal scores compare equal.
+They only become decimals again when written out.
+'''
+PointsScale = 100
+
+# '16.3' -> 1630, raises ValueError for anything that isn't a score like '--'
+def ParsePoints(text):
+	text = text.strip()
+	sign = 1
+	if text.startswith('-'):
+		sign = -1
+		text = text[1:]
+
+	whole, dot, fraction = text.partition('.')
+	if not (whole + fraction).isdigit() or len(fraction) > 2:
+		raise ValueError("Not a score: " + text)
+
+	return sign * (int(whole or "0") * PointsScale + int((fraction + "00")[:2]))
+
+def FormatPoints(points):
+	return points / float(PointsScale)
+
 # Base class used to hold generic data
 # The csv writer works on arrays so this class
 # Wraps an array giving user ability to set named attributes
 # on am instance.
-class RowData:
+class RowData(object):
 
 	# values and attrs arrays must be of same length
 	# each index maps to the other in same array
@@ -66,14 +515,22 @@ class RowData:
 		self.values = []
 		self.attrs =  []
 
+	# attrs holding integer hundredths, see ParsePoints
+	pointAttrs = ()
+
 	# Order in which fields get written to file
+	# Points are only turned back into decimals here
 	def __getitem__(self, i):
+		if self.attrs[i] in self.pointAttrs:
+			return FormatPoints(self.values[i])
 		return self.values[i]
 
 	# if 'attrs' field doesn't exist yet, set attr as normal
+	# Attributes set before 'attrs' (like playerId) stay plain attributes
+	# and are never written to file
 	# otherwise this will crash if 'attr' isn't in self.attrs list
 	def __setattr__(self, attr, value):
-		if "attrs" not in self.__dict__:
+		if "attrs" not in self.__dict__ or attr in self.__dict__:
 			self.__dict__[attr] = value
 		else:
 			attrIndex = self.__dict__["attrs"].index(attr)
@@ -98,6 +555,8 @@ class RowData:
 # One wrong lineup decision made by an owner
 # removedStarter and benchPlayer are both PlayerBoxScore instances
 class WrongDecision(RowData):
+	pointAttrs = ("pointsLost",)
+
 	def __init__(self, replacedStarter, benchPlayer):
 		self.values = ["", 0, "", "", 0]
 		self.attrs =  ["owner", "week", "replacedStarter", "benchPlayer", "pointsLost"]
@@ -106,41 +565,99 @@ class WrongDecision(RowData):
 		self.week = replacedStarter.week
 		self.replacedStarter = replacedStarter.playerName
 		self.benchPlayer = benchPlayer.playerName
-		self.pointsLost = round(Decimal(benchPlayer.points - replacedStarter.points),2)
+		self.pointsLost = benchPlayer.points - replacedStarter.points
 
 # One week's performance for a single player
 class PlayerBoxScore(RowData):
+	pointAttrs = ("points", "projection")
+
 	def __init__(self):
-		self.values = [0, "", "", "", "", "", "", "", "", 0.0, "", "", False, 0.0]
+		self.playerId = -1
+		self.values = [0, "", "", "", "", "", "", "", "", 0, "", "", False, 0]
 		self.attrs = ["week", "owner", "team", "opponent", "slot", "playerName", "playerTeam", "pos", "playerOpp", "points", "draftOwner", "draftAmount", "isBench", "projection"]
 
 # Individual auction draft result
 class PlayerDraftInfo(RowData):
 	def __init__(self):
+		self.playerId = -1
 		self.values = ["","","","", 0]
 		self.attrs = ["owner", "playerName", "playerTeam", "pos", "draftAmount"]
 
 # Individual waiver wire move
 class WaiverWireMove(RowData):
 	def __init__(self):
+		self.playerId = -1
+		self.droppedPlayerId = -1
 		self.values = ["", 0, "", "", "", 0, "", "", ""]
 		self.attrs = ["date", "week", "owner", "playerName", "playerPos", "cost", "result", "droppedPlayerName", "droppedPlayerPos"]
 
 # Projection upset start
 class ProjectionUpsetDecision(RowData):
+	pointAttrs = ("projectionDiff", "pointDiff")
+
 	def __init__(self, starter, benchPlayer):
-		self.values = ["", 0, "", "", 0.0, 0.0]
+		self.values = ["", 0, "", "", 0, 0]
 		self.attrs = ["owner", "week", "starter", "benchPlayer", "projectionDiff", "pointDiff"]
 
 		self.owner = starter.owner
 		self.week = starter.week
 		self.starter = starter.playerName
 		self.benchPlayer = benchPlayer.playerName
-		self.projectionDiff = round(Decimal(benchPlayer.projection - starter.projection),2)
-		self.pointDiff = round(Decimal(starter.points - benchPlayer.points),2)
+		self.projectionDiff = benchPlayer.projection - starter.projection
+		self.pointDiff = starter.points - benchPlayer.points
+
+# One draft pick or waiver pickup and what the owner got out of it
+# Weeks are the 1-based range the owner held the player
+class Acquisition(RowData):
+	pointAttrs = ("points", "startedPoints", "pointsAfterDrop")
+
+	def __init__(self):
+		self.playerId = -1
+		self.values = ["", "", "", "", 0, 0, 0, 0, 0, 0, "", ""]
+		self.attrs = ["owner", "playerName", "pos", "source", "week", "endWeek", "cost", "points", "startedPoints", "pointsAfterDrop", "pointsPerDollar", "startedPointsPerDollar"]
+
+# Starting lineup against the lineups with the highest projection and the most points
+# pointsLostIgnoringProjections is what starting the projection optimal lineup would have added
+class LineupComparison(RowData):
+	pointAttrs = ("points", "projectedLineupPoints", "optimalPoints", "pointsLostIgnoringProjections")
+
+	# owner and week are given since a team week can have no starters
+	def __init__(self, owner, week, startingScoreRowData, projectedLineup, optimalLineup):
+		self.values = ["", 0, 0, 0, 0, 0]
+		self.attrs = ["owner", "week", "points", "projectedLineupPoints", "optimalPoints", "pointsLostIgnoringProjections"]
+
+		self.owner = owner
+		self.week = week
+		self.points = sum([ player.points for player in startingScoreRowData ])
+		self.projectedLineupPoints = sum([ player.points for player in projectedLineup ])
+		self.optimalPoints = sum([ player.points for player in optimalLineup ])
+		self.pointsLostIgnoringProjections = self.projectedLineupPoints - self.points
+
+# Projection error over a group of player weeks
+# error is points scored minus points projected
+class ProjectionAccuracy(RowData):
+	def __init__(self):
+		self.values = ["", "", 0, 0.0, 0.0, 0.0, 0.0, 0.0]
+		self.attrs = ["group", "pos", "count", "projected", "points", "bias", "meanAbsError", "rmse"]
+
+# Player weeks bucketed by projection, within a group of them
+# group and pos are empty for the whole season
+class ProjectionCalibration(RowData):
+	def __init__(self):
+		self.values = ["", "", 0, 0, 0, 0.0, 0.0]
+		self.attrs = ["group", "pos", "bucketLow", "bucketHigh", "count", "projected", "points"]
+
+# How often an owner's lineup beat the projection optimal lineup
+class ProjectionLineupRecord(RowData):
+	pointAttrs = ("pointsVsProjectedLineup",)
+
+	def __init__(self):
+		self.values = ["", 0, 0, 0, 0]
+		self.attrs = ["owner", "beat", "trailed", "tied", "pointsVsProjectedLineup"]
 
 class Standing:
 	def __init__(self):
+		# integer hundredths, see ParsePoints
 		self.points = 0
 		self.wins = 0
 		self.losses = 0
@@ -148,7 +665,7 @@ class Standing:
 		self.madePlayoffs = False
 
 	def toList(self, owner):
-		return [owner,self.wins,self.losses,self.ties,round(Decimal(self.points),2),self.madePlayoffs]
+		return [owner,self.wins,self.losses,self.ties,FormatPoints(self.points),self.madePlayoffs]
 
 	# Compare two separate team standings
 	# The higher placed standing comes first
@@ -165,25 +682,218 @@ class Standing:
 		else:
 			return 1
 
+'''
+Known spellings that differ between espn pages.
+Alias -> canonical player name. Both sides get normalized.
+'''
+PlayerAliases = {}
+
+PlayerNameSuffixes = ['jr', 'sr', 'ii', 'iii', 'iv', 'v']
+
+PlayerDefenseSuffixes = ['d/st', 'dst', 'def', 'defense']
+
+# Lowercase, drop punctuation and generational suffixes
+# and spell every defense as 'team d/st'
+def NormalizePlayerName(name):
+	key = name.strip().lower().replace('.', '').replace("'", "").replace(',', ' ')
+	tokens = key.split()
+
+	while len(tokens) > 1 and tokens[-1] in PlayerNameSuffixes:
+		tokens.pop()
+
+	if len(tokens) > 1 and tokens[-1] in PlayerDefenseSuffixes:
+		tokens[-1] = 'd/st'
+
+	return ' '.join(tokens)
+
+'''
+Interns every player to a compact integer id.
+
+All per player data in Results is kept in lists indexed
+by that id, so joining draft, projections, waivers and boxscores
+is a list lookup instead of a string keyed dictionary lookup.
+'''
+class PlayerRegistry:
+	def __init__(self):
+
+		# playerId -> player name, the smallest spelling seen
+		# so it doesn't depend on which page got parsed first
+		self.names = []
+
+		# normalized name -> playerId
+		self.ids = {}
+
+		# normalized alias -> normalized name
+		self.aliases = {}
+
+		# source -> [lookups, misses]
+		self.joins = {}
+
+		# normalized name -> every spelling interned as it, for names
+		# with more than one, since dropping suffixes like 'Sr.' can
+		# join two different players under one id
+		self.collisions = {}
+
+		# Loaders intern players from several threads
+		self.lock = threading.Lock()
+
+		for alias in PlayerAliases:
+			self.AddAlias(alias, PlayerAliases[alias])
+
+	def AddAlias(self, alias, name):
+		self.aliases[NormalizePlayerName(alias)] = NormalizePlayerName(name)
+
+	def Key(self, name):
+		key = NormalizePlayerName(name)
+		return self.aliases.get(key, key)
+
+	# Return id for the player, assigning a new one if needed
+	def Intern(self, name):
+		key = self.Key(name)
+		with self.lock:
+			try:
+				playerId = self.ids[key]
+				if name != self.names[playerId]:
+					self.collisions.setdefault(key, set([self.names[playerId]])).add(name)
+					if name < self.names[playerId]:
+						self.names[playerId] = name
+				return playerId
+			except KeyError:
+				playerId = len(self.names)
+				self.ids[key] = playerId
+				self.names.append(name)
+				return playerId
+
+	# Return id for the player or -1 if never interned
+	def Find(self, name):
+		return self.ids.get(self.Key(name), -1)
+
+	def Name(self, playerId):
+		return self.names[playerId]
+
+	def __len__(self):
+		return len(self.names)
+
+	# Give every player the id of its place in name order
+	# Returns old id -> new id
+	def Renumber(self):
+		with self.lock:
+			keys = [None] * len(self.names)
+			for key in self.ids:
+				keys[self.ids[key]] = key
+
+			order = sorted(range(len(keys)), key=lambda playerId: keys[playerId])
+			newIds = [0] * len(order)
+			for newId, oldId in enumerate(order):
+				newIds[oldId] = newId
+
+			self.names = [ self.names[oldId] for oldId in order ]
+			self.ids = dict([ (key, newIds[self.ids[key]]) for key in self.ids ])
+			return newIds
+
+	# State for Rollback, players interned after it are forgotten
+	def Mark(self):
+		with self.lock:
+			joins = dict([ (source, list(self.joins[source])) for source in self.joins ])
+			collisions = dict([ (key, set(self.collisions[key])) for key in self.collisions ])
+			return list(self.names), joins, collisions
+
+	def Rollback(self, mark):
+		with self.lock:
+			self.names, self.joins, self.collisions = mark
+			self.ids = dict([ (key, playerId) for key, playerId in self.ids.items() if playerId < len(self.names) ])
+
+	# Keep track of how many joins against source found nothing
+	def RecordJoin(self, source, hit):
+		counts = self.joins.setdefault(source, [0, 0])
+		counts[0] += 1
+		if not hit:
+			counts[1] += 1
+
+	def MissRate(self, source):
+		lookups, misses = self.joins.get(source, [0, 0])
+		if lookups == 0:
+			return 0.0
+		return float(misses) / lookups
+
+	# Record spellings interned as key elsewhere, like in a backfill shard
+	def AddCollision(self, key, spellings):
+		with self.lock:
+			self.collisions.setdefault(key, set()).update(spellings)
+
+	def Report(self):
+		print(str(len(self.names)) + " players registered")
+		for source in sorted(self.joins):
+			lookups, misses = self.joins[source]
+			print("{} joins: {} lookups, {} misses ({:.1%})".format(source, lookups, misses, self.MissRate(source)))
+
+		# Check these are really the same player
+		print(str(len(self.collisions)) + " players joined from more than one spelling")
+		for key in sorted(self.collisions):
+			print("  " + key + ": " + ", ".join(sorted(self.collisions[key])))
+
+# Per player columns are lists indexed by playerId
+# that hold None for players without a value
+def SetPlayerColumn(column, playerId, value):
+	if playerId >= len(column):
+		column.extend([None] * (playerId + 1 - len(column)))
+	column[playerId] = value
+
+def GetPlayerColumn(column, playerId):
+	if playerId < 0 or playerId >= len(column):
+		return None
+	return column[playerId]
+
+# Column with every value moved to its player's new id
+def RemapPlayerColumn(column, newIds):
+	remapped = []
+	for playerId, value in enumerate(column):
+		if value is not None:
+			SetPlayerColumn(remapped, newIds[playerId], value)
+	return remapped
+
+# Row attributes holding player ids
+PlayerIdAttrs = ["playerId", "droppedPlayerId"]
+
+def RemapRowPlayerIds(rows, newIds):
+	for row in rows:
+		for attr in PlayerIdAttrs:
+			if attr in row.__dict__ and row.__dict__[attr] > -1:
+				row.__dict__[attr] = newIds[row.__dict__[attr]]
+
 class Results:
 	def __init__(self):
 
 		# Year the season took place
 		self.year = 0
 
+		# Checkpoint pages get parsed through, None to raise on any failure
+		# Not part of the snapshot
+		self.checkpoint = None
+
+		# espn league the season belongs to
+		self.leagueId = DefaultLeagueId
+
+		# Every player seen on any page
+		self.players = PlayerRegistry()
+
 		# owner -> Standing
 		self.standings = {}
 
 		# Standings if every owner set optimal starting lineup
 		self.standingsOptimal = {}
 
+		# Standings if every owner started the projection optimal lineup
+		self.standingsProjected = {}
+
 		# owner -> {owner -> Standing}
 		# Map of standings for each owner
 		# if just that owner made optimal starting lineup
 		self.standingsIndividualOptimal = {}
 		
-		# Player -> [owner who drafted player, draft cost]
-		self.playerDraftMap = {}
+		# playerId -> [owner who drafted player, draft cost]
+		# None for undrafted players
+		self.playerDraftMap = []
 
 		# list of [owner, player name, player team, pos, draft cost]
 		self.allDraftData = []
@@ -209,18 +919,72 @@ class Results:
 		self.waiverWireMoves = []
 
 		# Weekly espn projections for each player
-		# PlayerName -> []
-		self.projections = {}
+		# playerId -> [], None for players without projections
+		self.projections = []
 
 		# list of decisions where starter was projected for less points
 		# than a potential bench replacement
 		# List of ProjectionUpsetDecision
 		self.projectionUpsetDecisions = []
 
+		# Every team week's lineup against the projection optimal lineup
+		# List of LineupComparison
+		self.lineupComparisons = []
+
+		# Projection accuracy grouped by player, position and week
+		# Lists of ProjectionAccuracy
+		self.projectionAccuracyPlayers = []
+		self.projectionAccuracyPositions = []
+		self.projectionAccuracyWeeks = []
+
+		# Projection calibration over the whole season
+		# and within each player, position and week
+		# Lists of ProjectionCalibration
+		self.projectionCalibration = []
+		self.projectionCalibrationPlayers = []
+		self.projectionCalibrationPositions = []
+		self.projectionCalibrationWeeks = []
+
+		# List of ProjectionLineupRecord
+		self.projectionLineupRecords = []
+
+		# Every draft pick and successful waiver pickup
+		# List of Acquisition sorted by playerId then week
+		self.acquisitions = []
+
+		# Answers who owned a player in a given week
+		# See OwnershipIndex
+		self.ownership = None
+
+	# Lists parsing pages only appends to
+	AppendedLists = ["allDraftData", "playerData", "wrongDecisionsAll", "wrongDecisionsOptimal", "waiverWireMoves", "projectionUpsetDecisions"]
+
+	#
+	# Everything parsing a page can change, so a page that fails
+	# halfway through can be taken back out with Rollback
+	#
+	def Mark(self):
+		return {
+			"lengths" : [ len(self.__dict__[name]) for name in Results.AppendedLists ],
+			"players" : self.players.Mark(),
+			"playerDraftMap" : list(self.playerDraftMap),
+			"projections" : [ None if weekly is None else list(weekly) for weekly in self.projections ],
+			"standings" : copy.deepcopy([self.divisions, self.standings, self.standingsOptimal, self.standingsProjected, self.standingsIndividualOptimal])
+		}
+
+	def Rollback(self, mark):
+		for name, length in zip(Results.AppendedLists, mark["lengths"]):
+			del self.__dict__[name][length:]
+		self.players.Rollback(mark["players"])
+		self.playerDraftMap = mark["playerDraftMap"]
+		self.projections = mark["projections"]
+		self.divisions, self.standings, self.standingsOptimal, self.standingsProjected, self.standingsIndividualOptimal = mark["standings"]
+
 	def InitializeWithOwners(self):
 		for owner in self.divisions["east"] + self.divisions["west"]:
 			self.standings[owner] = Standing()
 			self.standingsOptimal[owner] = Standing()
+			self.standingsProjected[owner] = Standing()
 
 			# initialize individual optimal standings here
 			self.standingsIndividualOptimal[owner] = {}
@@ -231,6 +995,7 @@ class Results:
 		# figure out top 4 playoff teams for each standings
 		CalculatePlayoffTeams(self.divisions, self.standings)
 		CalculatePlayoffTeams(self.divisions, self.standingsOptimal)
+		CalculatePlayoffTeams(self.divisions, self.standingsProjected)
 		for index,owner in enumerate(self.standingsIndividualOptimal):
 			CalculatePlayoffTeams(self.divisions, self.standingsIndividualOptimal[owner])
 
@@ -256,201 +1021,408 @@ class Results:
 	 	self.outputRows("results/draft.csv", self.allDraftData)
 	 	self.outputRows("results/waiverMoves.csv", self.waiverWireMoves)
 	 	self.outputRows("results/projectionUpsetDecisions.csv", self.projectionUpsetDecisions)
+	 	self.outputRows("results/acquisitions.csv", self.acquisitions)
+	 	self.outputRows("results/lineupComparisons.csv", self.lineupComparisons)
+	 	self.outputRows("results/projectionAccuracyPlayers.csv", self.projectionAccuracyPlayers)
+	 	self.outputRows("results/projectionAccuracyPositions.csv", self.projectionAccuracyPositions)
+	 	self.outputRows("results/projectionAccuracyWeeks.csv", self.projectionAccuracyWeeks)
+	 	self.outputRows("results/projectionCalibration.csv", self.projectionCalibration)
+	 	self.outputRows("results/projectionCalibrationPlayers.csv", self.projectionCalibrationPlayers)
+	 	self.outputRows("results/projectionCalibrationPositions.csv", self.projectionCalibrationPositions)
+	 	self.outputRows("results/projectionCalibrationWeeks.csv", self.projectionCalibrationWeeks)
+	 	self.outputRows("results/projectionLineupRecords.csv", self.projectionLineupRecords)
 	 	self.outputStandings("results/standings.csv", self.standings)
 	 	self.outputStandings("results/standingsOptimal.csv", self.standingsOptimal)
+	 	self.outputStandings("results/standingsProjected.csv", self.standingsProjected)
 
 	 	for index,owner in enumerate(self.standingsIndividualOptimal):
 	 		standings = self.standingsIndividualOptimal[owner]
 	 		filename = "results/standingsOptimal-"+owner+".csv"
 	 		self.outputStandings(filename,standings)
 
-PosInSlotMap = 	{ 
-					'QB' : ['QB'],
-					'RB' : ['RB'],
-					'WR' : ['WR'],
-					'TE' : ['TE'],
-					'DEF': ['Defense'],
-					'FLEX' : ['RB', 'WR'],
-					'EX-FLEX' : ['RB', 'WR', 'TE']
-				}
+'''
+Roster configuration
+
+Every position gets one bit and every slot the mask of the positions
+allowed in it, so whether a player fits a slot is a single AND.
+RosterSlots maps espn's slot label to the slot name used in the results
+and the positions allowed in that slot. Other league formats (superflex,
+IDP, K, OP) only need a different RosterSlots, see LoadRosterSlots.
+'''
 
+# Every position a player can have, espn's D/ST is Defense
+Positions = ['QB', 'RB', 'WR', 'TE', 'K', 'Defense', 'DT', 'DE', 'LB', 'CB', 'S']
+
+DefaultRosterSlots = {
+	'QB' : ['QB', ['QB']],
+	'RB' : ['RB', ['RB']],
+	'WR' : ['WR', ['WR']],
+	'TE' : ['TE', ['TE']],
+	'D/ST' : ['DEF', ['Defense']],
+	'RB/WR' : ['FLEX', ['RB', 'WR']],
+	'FLEX' : ['EX-FLEX', ['RB', 'WR', 'TE']],
+	'K' : ['K', ['K']],
+	'OP' : ['OP', ['QB', 'RB', 'WR', 'TE']],
+	'QB/RB/WR/TE' : ['SUPERFLEX', ['QB', 'RB', 'WR', 'TE']],
+	'WR/TE' : ['WR/TE', ['WR', 'TE']],
+	'DT' : ['DT', ['DT']],
+	'DE' : ['DE', ['DE']],
+	'LB' : ['LB', ['LB']],
+	'CB' : ['CB', ['CB']],
+	'S' : ['S', ['S']],
+	'DL' : ['DL', ['DT', 'DE']],
+	'DB' : ['DB', ['CB', 'S']],
+	'DP' : ['DP', ['DT', 'DE', 'LB', 'CB', 'S']]
+}
+
+# position -> bit
+PositionBits = dict([ (pos, 1 << index) for index,pos in enumerate(Positions) ])
+
+# Roster slots in use, laid out like DefaultRosterSlots
+RosterSlots = {}
+
+# espn slot label -> slot name
+SlotNames = {}
+
+# slot name -> mask of positions allowed in the slot
+SlotMasks = {}
+
+#
+# Compile the roster slots into SlotNames and SlotMasks
+# They are saved with every snapshot and set again when it loads,
+# so whatever reads a snapshot (live.py, backfill.py) uses the
+# roster its pages were parsed with.
+#
+def SetRosterSlots(rosterSlots):
+	RosterSlots.clear()
+	SlotNames.clear()
+	SlotMasks.clear()
+	for label in rosterSlots:
+		slot, positions = rosterSlots[label]
+
+		mask = 0
+		for pos in positions:
+			if pos not in PositionBits:
+				raise ValueError("Unknown position " + pos + " in roster slot " + label)
+			mask |= PositionBits[pos]
+
+		RosterSlots[label] = [slot, list(positions)]
+		SlotNames[label] = slot
+		SlotMasks[slot] = mask
+
+# Roster slots from a json file in the same layout as DefaultRosterSlots
+def LoadRosterSlots(filename):
+	with open(filename, "r") as f:
+		SetRosterSlots(json.load(f))
+
+SetRosterSlots(DefaultRosterSlots)
+
+# Unknown positions (like an empty slot's) fit nowhere
+def GetPosMask(pos):
+	return PositionBits.get(pos, 0)
+
+# Unknown slots (like Bench) fit nobody
+def GetSlotMask(slot):
+	return SlotMasks.get(slot, 0)
 
 def DoesPosFitInSlot(pos, slot):
-	return pos in PosInSlotMap[slot]
+	return GetPosMask(pos) & GetSlotMask(slot) != 0
 
 # Given a link element parse out owner name from title.
 # Format is 'team name (owner name)'
 def ParseOwner(linkTag):
-	title = linkTag['title']
+	return ParseOwnerTitle(linkTag['title'])
+
+def ParseOwnerTitle(title):
 	idxStart = title.index('(')
 	idxEnd = title.index(')')
 	owner = title[idxStart+1:idxEnd]
 	return owner
 
-def LoadProjectionFile(scoringPeriodId, slotId, page, results):
-	
-	url = GetProjectionsUrl(scoringPeriodId, results.year, page, slotId)
+# FetchAndParse job for one projections page
+def GetProjectionFileJob(scoringPeriodId, slotId, page, leagueId, year):
+
+	url = GetProjectionsUrl(leagueId, scoringPeriodId, year, page, slotId)
 	filename = str(scoringPeriodId) + "_" + str(slotId) + "_" + str(page) + ".html"
 
-	content = LoadContent(url, "projections", filename)
+	return (url, "projections", filename, scoringPeriodId)
+
+# (player name, points) text of every player row
+# BeautifulSoup version of extract.ExtractProjections
+def GetProjectionRows(content):
+
 	soup = BeautifulSoup(content, 'html.parser')
 
 	table = soup.find('table', class_='tableBody')
 	tableRows = table.find_all('tr', class_='pncPlayerRow')
 
+	rows = []
 	for row in tableRows:
 		cells = row.find_all('td')
 		if len(cells) is not 16 and len(cells) is not 13:
 			continue
 
-		playerName = str(cells[0].a.text)
-		points = float(cells[len(cells)-1].text)
+		rows.append((cells[0].a.text, cells[len(cells)-1].text))
 
-		weeklyProjections = None
-		try:
-			weeklyProjections = results.projections[playerName]
-		except KeyError:
-			results.projections[playerName] = [0]*13
-			weeklyProjections = results.projections[playerName]
+	return rows
+
+def ParseProjectionFile(content, scoringPeriodId, results):
+
+	if UseStreamingExtractors:
+		rows = extract.ExtractProjections(content)
+	else:
+		rows = GetProjectionRows(content)
+
+	for playerName, pointsText in rows:
+
+		playerName = str(playerName)
+		points = ParsePoints(pointsText)
+
+		playerId = results.players.Intern(playerName)
+		weeklyProjections = GetPlayerColumn(results.projections, playerId)
+		if weeklyProjections is None:
+			weeklyProjections = [0]*13
+			SetPlayerColumn(results.projections, playerId, weeklyProjections)
 
 		# Week is 0-based vs the 1-based scoringPeriodId
 		weeklyProjections[scoringPeriodId-1] = points
 
-'''
-'''
-def LoadProjections(results):
+# FetchAndParse jobs for every projections page of the season
+def GetProjectionJobs(results):
 
 	QBSlot = 0
 	RbWrSlot = 3
 	TESlot = 6
 	DefSlot = 16
 
+	# (slot, page) in download order
+	slotPages = [(QBSlot, 0), (DefSlot, 0), (TESlot, 0)] + [ (RbWrSlot, page) for page in range(5) ]
+
+	jobs = []
 	for scoringPeriodId in range(1,14):
-		LoadProjectionFile(scoringPeriodId, QBSlot, 0, results)
-		LoadProjectionFile(scoringPeriodId, DefSlot, 0, results)
-		LoadProjectionFile(scoringPeriodId, TESlot, 0, results)
-		LoadProjectionFile(scoringPeriodId, RbWrSlot, 0, results)
-		LoadProjectionFile(scoringPeriodId, RbWrSlot, 1, results)
-		LoadProjectionFile(scoringPeriodId, RbWrSlot, 2, results)
-		LoadProjectionFile(scoringPeriodId, RbWrSlot, 3, results)
-		LoadProjectionFile(scoringPeriodId, RbWrSlot, 4, results)
+		for slotId, page in slotPages:
+			jobs.append(GetProjectionFileJob(scoringPeriodId, slotId, page, results.leagueId, results.year))
+	return jobs
 
 '''
 '''
-def LoadDraft(results):
+def LoadProjections(results):
+	jobs = GetProjectionJobs(results)
+	FetchAndParse(jobs, lambda content, scoringPeriodId: ParseProjectionFile(content, scoringPeriodId, results), results.checkpoint)
 
-	content = LoadContent(GetDraftUrl(results.year), "draft", "draft.html")
+'''
+'''
+#
+# Every pick on the draft recap page
+# BeautifulSoup version of extract.ExtractDraft
+#
+# (owner link title, player link text, player cell text, amount text)
+# Rows are walked once in page order and each tableHead row switches
+# the owner of the picks after it, so it doesn't matter whether every
+# team has its own table or all teams share one.
+#
+def GetDraftRows(content):
 
 	soup = BeautifulSoup(content, 'html.parser')
 
-	for team in soup.find_all('tr', class_='tableHead'):
-		
-		for player in team.find_next_siblings('tr'):
-
-			playerDraftInfo = PlayerDraftInfo()
-			
-			# Need to grab the owner name because
-			# We have one too many 'Butt Stuffs' in our league
-			owner = ParseOwner(team.a)
-			playerDraftInfo.owner = owner
-
-			data = player.find_all('td')
-			playerName = data[1].a.text.strip()
-			playerDraftInfo.playerName = playerName
-
-			playerData = data[1].text.strip()
-			if 'D/ST' in playerData:
-				playerDraftInfo.playerTeam = ""
-				playerDraftInfo.pos = "Defense"
-			else:
-				playerDetails = playerData.split(',')[1].strip().split()
-				playerDraftInfo.playerTeam = playerDetails[0]
-				playerDraftInfo.pos = playerDetails[1]
+	rows = []
+	ownerTitle = None
+	for row in soup.find_all('tr'):
+		if 'tableHead' in row.get('class', []):
+			team = row.a
+			ownerTitle = team['title'] if team is not None else None
+			continue
+
+		data = row.find_all('td')
+		if ownerTitle is None or len(data) < 3 or data[1].a is None:
+			continue
+
+		rows.append((ownerTitle, data[1].a.text, data[1].text, data[2].text))
+
+	return rows
+
+# 'Name, PIT QB' -> ('PIT', 'QB'), defenses have no team
+def ParseDraftPlayer(playerData):
+	if 'D/ST' in playerData:
+		return "", "Defense"
+
+	playerDetails = playerData.partition(',')[2].split()
+	return playerDetails[0], playerDetails[1]
+
+def ParseDraftPage(content, results):
+
+	if UseStreamingExtractors:
+		rows = extract.ExtractDraft(content)
+	else:
+		rows = GetDraftRows(content)
+
+	for ownerTitle, playerName, playerData, amount in rows:
+
+		playerDraftInfo = PlayerDraftInfo()
 
-			amount = data[2].text.strip()[1:]
-			playerDraftInfo.draftAmount = amount
+		# Need to grab the owner name because
+		# We have one too many 'Butt Stuffs' in our league
+		owner = ParseOwnerTitle(ownerTitle)
+		playerDraftInfo.owner = owner
 
-			results.playerDraftMap[str(playerName)] = [str(owner), str(amount)]
-			results.allDraftData.append(playerDraftInfo)
+		playerName = playerName.strip()
+		playerDraftInfo.playerName = playerName
+		playerDraftInfo.playerId = results.players.Intern(playerName)
+
+		playerDraftInfo.playerTeam, playerDraftInfo.pos = ParseDraftPlayer(playerData.strip())
+
+		amount = amount.strip()[1:]
+		playerDraftInfo.draftAmount = amount
+
+		SetPlayerColumn(results.playerDraftMap, playerDraftInfo.playerId, [str(owner), str(amount)])
+		results.allDraftData.append(playerDraftInfo)
+
+def LoadDraft(results):
+	jobs = [ (GetDraftUrl(results.leagueId, results.year), "draft", "draft.html", None) ]
+	FetchAndParse(jobs, lambda content, context: ParseDraftPage(content, results), results.checkpoint)
 
 '''
 Load up all waiver wire activity and store data in results
 
-Easiest/simpliest way to convert dates to NFL weeks is
-to use the hardcoded map. Year -> MondayFootballDates.
-MondayFootballDates will be list of dates in format YYYYMMDD.
+Dates are converted to NFL weeks with the Monday dates of
+the season's weeks, see GetWeekForDate.
 '''
 
-MondayDates = {'2016' : []}
+# Monday dates of the 13 regular season weeks
+# given week 1's Monday in format 'yyyymmdd'
+def GetMondayDates(firstMonday):
+	start = datetime.datetime.strptime(firstMonday, "%Y%m%d")
+	return [ (start + datetime.timedelta(weeks=i)).strftime("%Y%m%d") for i in range(13) ]
+
+# Week 1's Monday game is the Monday after Labor Day,
+# the first Monday in September, in format 'yyyymmdd'
+def GetFirstMonday(year):
+	laborDay = datetime.datetime(int(year), 9, 1)
+	laborDay += datetime.timedelta(days=(7 - laborDay.weekday()) % 7)
+	return (laborDay + datetime.timedelta(weeks=1)).strftime("%Y%m%d")
+
+# Seasons the Labor Day rule doesn't hold for go here
+# Year -> Monday dates, other years are filled in by GetWeekForDate
+MondayDates = {'2016' : GetMondayDates('20160912'), '2017' : GetMondayDates('20170911')}
+
+# A move made after a week's Monday game counts towards the next week
+# Raises ValueError for a year that isn't one
+def GetWeekForDate(year, date):
+	mondays = MondayDates.get(str(year))
+	if mondays is None:
+		mondays = GetMondayDates(GetFirstMonday(year))
+		MondayDates[str(year)] = mondays
+	return bisect.bisect_left(mondays, date) + 1
+
+# FetchAndParse jobs for every date in the waiver report
+# None when the checkpoint quarantined the default waiver page
+def GetWaiverJobs(results):
+	job = (GetDefaultWaiverReportUrl(results.leagueId, results.year), "waivers", "defaultwaivers.html", None)
+	dates = LoadIndexPage(job, lambda content, context: GetWaiverDates(content), results.checkpoint)
+	if dates is None:
+		return None
 
-def LoadWaiverWire(results):
-	content = LoadContent(DefaultWaiverReportUrl, "waivers", "defaultwaivers.html")
+	# TODO rule out post week 13 dates
+
+	return [ (GetWaiverReportForDateUrl(results.leagueId, results.year, date), "waivers", "waiver_"+date+".html", date) for date in dates ]
+
+# Date values of each option in the default waiver page's select dropdown
+def GetWaiverDates(content):
 	soup = BeautifulSoup(content, 'html.parser')
-	
+
 	combo = soup.find('select')
 	options = combo.find_all('option')
 
-	# grab date values for each option in the select dropdown
-	dates = [ str(x['value']) for x in options ]
+	return [ str(x['value']) for x in options ]
 
-	# TODO rule out post week 13 dates
+def LoadWaiverWire(results):
+	jobs = GetWaiverJobs(results)
+	if jobs is None:
+		return
+	FetchAndParse(jobs, lambda content, date: ParseWaiverPage(content, date, results), results.checkpoint)
 
-	for date in dates:
-		url = GetWaiverReportForDateUrl(date)
-		filename = "waiver_"+date+".html"
-		content = LoadContent(url, "waivers", filename)
+# Text of TagText(tag) or None if there is no tag
+def TagText(tag):
+	if tag is None:
+		return None
+	return tag.text
 
-		soup = BeautifulSoup(content, 'html.parser')
+#
+# Cells of every move on a waiver page
+# BeautifulSoup version of extract.ExtractWaivers
+#
+# (owner link title, player cell text, player link text, cost text,
+#  result strong text, dropped player bold text, result cell text)
+# Tags that aren't in the cell are None
+#
+def GetWaiverRows(content):
+	soup = BeautifulSoup(content, 'html.parser')
 
-		# Grab all rows in the main table
-		# There not be any moves on a date
-		table = soup.find('table', class_='tableBody')
-		if table is None:
+	# Grab all rows in the main table
+	# There not be any moves on a date
+	table = soup.find('table', class_='tableBody')
+	if table is None:
+		return []
+
+	rows = []
+	for row in table.find_all('tr'):
+		cells = row.find_all('td')
+		if len(cells) < 5:
 			continue
 
-		tableRows = table.find_all('tr')
+		rows.append((cells[1].a['title'], cells[2].text, TagText(cells[2].a), cells[3].text, TagText(cells[4].strong), TagText(cells[4].b), cells[4].text))
 
-		for row in tableRows:
-			cells = row.find_all('td')
-			if len(cells) < 5:
-				continue
+	return rows
 
-			move = WaiverWireMove()
-			move.date = date
+# All waiver moves made on one date
+def ParseWaiverPage(content, date, results):
 
-			owner = ParseOwner(cells[1].a)
-			move.owner = owner
+	if UseStreamingExtractors:
+		rows = extract.ExtractWaivers(content)
+	else:
+		rows = GetWaiverRows(content)
 
-			text = cells[2].text
-			idx = text.find(',')
-			if idx == -1:
-				# Defense has no comma
-				move.playerName = cells[2].a.text
-				move.playerPos = "Defense"
-			else:
-				move.playerName = text[0:idx]
-				move.playerPos = text[idx:].split(' ')[2]
+	for ownerTitle, playerText, playerLinkText, costText, resultText, droppedText, resultCellText in rows:
 
-			# Gets rid of the dollar sign
-			move.cost = int(cells[3].text[1:])
+		move = WaiverWireMove()
+		move.date = date
+		move.week = GetWeekForDate(results.year, date)
 
-			# Move acceppted uses the strong tag
-			if cells[4].strong is not None:
-				# remove the period from text
-				move.result = cells[4].strong.text[:-1] 
-			else:
-				move.result = "Unsuccessful"
+		owner = ParseOwnerTitle(ownerTitle)
+		move.owner = owner
+
+		idx = playerText.find(',')
+		if idx == -1:
+			# Defense has no comma
+			move.playerName = playerLinkText
+			move.playerPos = "Defense"
+		else:
+			move.playerName = playerText[0:idx]
+			move.playerPos = playerText[idx:].split(' ')[2]
+
+		move.playerId = results.players.Intern(move.playerName)
+
+		# Gets rid of the dollar sign
+		move.cost = int(costText[1:])
+
+		# Move acceppted uses the strong tag
+		if resultText is not None:
+			# remove the period from text
+			move.result = resultText[:-1]
+		else:
+			move.result = "Unsuccessful"
 
-			if cells[4].b is not None:
-				# Dropped player name is bold, so grab its text
-				move.droppedPlayerName = cells[4].b.text
+		if droppedText is not None:
+			# Dropped player name is bold, so grab its text
+			move.droppedPlayerName = droppedText
 
-				# Parse out dropped player position
-				idx2 = cells[4].text.find(',')
-				pos = cells[4].text[idx2:].split(' ')[2]
-				move.droppedPlayerPos = pos
+			# Parse out dropped player position
+			idx2 = resultCellText.find(',')
+			pos = resultCellText[idx2:].split(' ')[2]
+			move.droppedPlayerPos = pos
+			move.droppedPlayerId = results.players.Intern(move.droppedPlayerName)
 
-			results.waiverWireMoves.append(move)
+		results.waiverWireMoves.append(move)
 
 
 def CalculatePlayoffTeams(divisions, standings):
@@ -492,8 +1464,11 @@ def CalculatePlayoffTeams(divisions, standings):
 # This assumes all standings in results have been calculated
 #
 def LoadDivisions(results):
+	jobs = [ (GetStandingsUrl(results.leagueId, results.year), "divisions", "divisions.html", None) ]
+	FetchAndParse(jobs, lambda content, context: ParseDivisionsPage(content, results), results.checkpoint)
+
+def ParseDivisionsPage(content, results):
 
-	content = LoadContent(GetStandingsUrl(results.year), "divisions", "divisions.html")
 	soup = BeautifulSoup(content, 'html.parser')
 
 	mainDiv = soup.find('div', class_='games-fullcol')
@@ -522,26 +1497,33 @@ def LoadDivisions(results):
 #
 def GenerateAllWrongDecisions(startingScoreRowData, benchScoreRowData, allWrongDecisions, projectionUpsetDecisions):
 	
-	# Account of shuffling rb/wr to flex slots
-	# if there is a wr in flex or exflex
-		# that means a rb can replace any wr
-	# if there is a rb in flex or exflex
-		# that means a wr can replace any rb
-
-	rbCanCheckWr = False
-	wrCanCheckRb = False
-	for starter in startingScoreRowData:
-		if starter.slot == 'FLEX' or starter.slot == 'EX-FLEX':
-			if starter.pos == 'WR':
-				rbCanCheckWr = True
-			elif starter.pos == 'RB':
-				wrCanCheckRb = True
+	# Account for shuffling starters between slots
+	# A bench player can replace a starter if he fits the starter's slot
+	# or if another starter can move into that slot and free up one he fits.
+	# Like a rb replacing any wr when there is a wr in flex.
+	# Only positions every flex slot of the lineup takes get shuffled,
+	# so with FLEX and EX-FLEX that is rb and wr but never te.
+	slotMasks = [ GetSlotMask(starter.slot) for starter in startingScoreRowData ]
+	posMasks = [ GetPosMask(starter.pos) for starter in startingScoreRowData ]
+
+	# Slots taking more than one position are flex slots
+	flexMasks = [ slotMask for slotMask in slotMasks if slotMask & (slotMask - 1) ]
+	shuffleMask = flexMasks[0] if len(flexMasks) > 0 else 0
+	for flexMask in flexMasks:
+		shuffleMask &= flexMask
+
+	replaceMasks = []
+	for index,slotMask in enumerate(slotMasks):
+		replaceMask = slotMask
+		for other,otherSlotMask in enumerate(slotMasks):
+			if other != index and posMasks[other] & slotMask & shuffleMask:
+				replaceMask |= otherSlotMask & shuffleMask
+		replaceMasks.append(replaceMask)
 
 	for benchPlayer in benchScoreRowData:
-		for starter in startingScoreRowData:
-			if (not DoesPosFitInSlot(benchPlayer.pos, starter.slot) and
-				not (benchPlayer.pos == 'WR' and starter.slot == 'RB' and wrCanCheckRb) and
-				not (benchPlayer.pos == 'RB' and starter.slot == 'WR' and rbCanCheckWr)):
+		benchMask = GetPosMask(benchPlayer.pos)
+		for index,starter in enumerate(startingScoreRowData):
+			if not benchMask & replaceMasks[index]:
 				continue
 
 			if benchPlayer.points > starter.points:
@@ -551,119 +1533,214 @@ def GenerateAllWrongDecisions(startingScoreRowData, benchScoreRowData, allWrongD
 				projectionUpsetDecisions.append(ProjectionUpsetDecision(starter, benchPlayer))
 
 #
-# Calculate the optimal lineup
+# Lineup engine
 #
-# Output
-# 	list of optimal starters
-# 	list of wrong decisions (bench players that should have been started)
+# Lineups are solved on indices into players (starters then bench)
+# so no PlayerBoxScore is ever modified and the same rows can be
+# solved for as many different values as needed.
 #
-def RunOptimalLinupAlgo(startingScoreRowData, benchScoreRowData, optimalWrongDecisions):
-	
-	startingPlayers = startingScoreRowData[:]
-	
-	playersToInsert = benchScoreRowData[:]
-	startersRemovedFromLineup = []
-
-	# Attempts to set the optimal lineup
-	# by placing bench players into lineup where they
-	# get biggest points gain.
-	# The removed starter is then placed back into the queue
-	# to see if there is another spot for him
+
+# fits[player][index] is whether player can play the index'th starting slot
+# Slots never change, the index'th slot is always the index'th starter's
+def GetLineupFits(startingScoreRowData, benchScoreRowData):
+	slotMasks = [ GetSlotMask(starter.slot) for starter in startingScoreRowData ]
+	players = startingScoreRowData + benchScoreRowData
+	fits = []
+	for player in players:
+		posMask = GetPosMask(player.pos)
+		fits.append([ posMask & slotMask != 0 for slotMask in slotMasks ])
+	return players, fits
+
+#
+# Attempts to set the optimal lineup
+# by placing bench players into lineup where they
+# get biggest value gain.
+# The removed starter is then placed back into the queue
+# to see if there is another spot for him
+#
+# values[player] is what gets maximized, like points or projection
+# Returns the lineup (player per starting slot) and every player
+# removed from the lineup in order of removal
+#
+def RunLineupGreedy(fits, values, starterCount):
+
+	lineup = list(range(starterCount))
+	playersToInsert = list(range(starterCount, len(values)))
+	removed = []
+
 	while len(playersToInsert) > 0:
 
 		player = playersToInsert.pop(0)
 
-		if player.points <= 0:
+		if values[player] <= 0:
 			continue
 
-		# newSlot[0] is the index of starter
-		# newSlot[1] is the point difference
-		newSlot = [-1,0]
-
-		for index,starter in enumerate(startingPlayers):
-			if not DoesPosFitInSlot(player.pos, starter.slot):
+		# Find the biggest gain for our new player
+		bestIndex = -1
+		bestGain = 0
+		for index,current in enumerate(lineup):
+			if not fits[player][index]:
 				continue
 
-			# Find the biggest point gain for our new player
-			pointDiff = player.points - starter.points
-			if round(pointDiff,2) > round(newSlot[1],2):
-				newSlot[0] = index
-				newSlot[1] = pointDiff
-
-		if newSlot[0] > -1:
+			gain = values[player] - values[current]
+			if gain > bestGain:
+				bestIndex = index
+				bestGain = gain
 
+		if bestIndex > -1:
 			# Try to reinsert the now benched player back
 			# into starting lineup. Maybe there is still hope
-			playerToRemove = startingPlayers[newSlot[0]]
-			playersToInsert.append(playerToRemove)
+			playersToInsert.append(lineup[bestIndex])
+			removed.append(lineup[bestIndex])
+			lineup[bestIndex] = player
 
-			if not playerToRemove.isBench:
-				startersRemovedFromLineup.append(startingPlayers[newSlot[0]])
+	return lineup, removed
+
+#
+# Solve the lineup for every value function in one go
+# Returns one list of PlayerBoxScores per value function,
+# in the same order as the starting slots
+#
+def SolveLineups(startingScoreRowData, benchScoreRowData, valueFunctions):
+	players, fits = GetLineupFits(startingScoreRowData, benchScoreRowData)
+
+	lineups = []
+	for valueFunction in valueFunctions:
+		values = [ valueFunction(player) for player in players ]
+		lineup, removed = RunLineupGreedy(fits, values, len(startingScoreRowData))
+		lineups.append([ players[player] for player in lineup ])
+	return lineups
+
+#
+# Calculate the optimal lineup
+#
+# Output
+# 	list of optimal starters
+# 	list of wrong decisions (bench players that should have been started)
+#
+def RunOptimalLinupAlgo(startingScoreRowData, benchScoreRowData, optimalWrongDecisions):
+
+	players, fits = GetLineupFits(startingScoreRowData, benchScoreRowData)
+	values = [ player.points for player in players ]
+	lineup, removed = RunLineupGreedy(fits, values, len(startingScoreRowData))
+
+	startersRemovedFromLineup = [ player for player in removed if not players[player].isBench ]
 
-			# set player's slot and place into the starting lineup!
-			player.slot = playerToRemove.slot
-			startingPlayers[newSlot[0]] = player
-			
 	# get list of actual swaps and add to wrong decisions list
 	# There should be one swap (bench player) per removed starter
 	# it doesn't really matter which one
 	replacedPlayers = []
 	for removedStarter in startersRemovedFromLineup:
-		for starter in startingPlayers:
-			if starter.isBench and DoesPosFitInSlot(removedStarter.pos, starter.slot) and starter not in replacedPlayers:
-				wrongDecision = WrongDecision(removedStarter, starter)
+		for index,player in enumerate(lineup):
+			starter = players[player]
+			if starter.isBench and fits[removedStarter][index] and starter not in replacedPlayers:
+				wrongDecision = WrongDecision(players[removedStarter], starter)
 				optimalWrongDecisions.append(wrongDecision)
 				replacedPlayers.append(starter)
 				break
 
-	return startingPlayers
+	return [ players[player] for player in lineup ]
 
 #
-# Return list of PlayerBoxScore row data from the given playerTable
+# Batch pass over every team week already in playerData
+#
+# Rebuilds each team's starters and bench from the rows, solves the
+# points optimal and projection optimal lineups together and fills
+# lineupComparisons and standingsProjected. No page is parsed.
 #
-def LoadStatsForTeam(playerTable, index, week, owners, teamNames, playerDraftMap, projections):
+def CalculateLineups(results):
+
+	# (week, owner) -> [starters, bench] in page order
+	teamWeeks = {}
+	teamWeekOrder = []
+	for row in results.playerData:
+		key = (int(row.week), row.owner)
+		teamWeek = teamWeeks.get(key)
+		if teamWeek is None:
+			teamWeek = [[], [], row]
+			teamWeeks[key] = teamWeek
+			teamWeekOrder.append(key)
+		teamWeek[1 if row.isBench else 0].append(row)
+
+	results.lineupComparisons = []
+	for owner in results.standingsProjected:
+		results.standingsProjected[owner] = Standing()
+
+	# week -> team name -> LineupComparison
+	weekTeams = {}
+	for key in teamWeekOrder:
+		starters, bench, row = teamWeeks[key]
+		optimalLineup, projectedLineup = SolveLineups(starters, bench, [lambda player: player.points, lambda player: player.projection])
+
+		comparison = LineupComparison(row.owner, row.week, starters, projectedLineup, optimalLineup)
+		results.lineupComparisons.append(comparison)
+		weekTeams.setdefault(key[0], {})[row.team] = (comparison, row.opponent)
+
+	# Standings if every owner had started the projection optimal lineup
+	for week in sorted(weekTeams):
+		teams = weekTeams[week]
+		for team in sorted(teams):
+			comparison, opponent = teams[team]
+			if opponent not in teams or team > opponent:
+				continue
+
+			oppComparison = teams[opponent][0]
+			owners = [comparison.owner, oppComparison.owner]
+			if owners[0] in results.standingsProjected and owners[1] in results.standingsProjected:
+				UpdateStandings(owners, results.standingsProjected, [comparison.projectedLineupPoints, oppComparison.projectedLineupPoints])
+
+#
+# Cells of every player row in a starter or bench table
+# (slot label, player name, player info text, opponent, points text)
+# Player name is None for an empty slot
+#
+def GetTeamRows(playerTable):
+
+	rows = []
+	for row in playerTable.find_all('tr', class_='pncPlayerRow'):
+		label = row.find('td', class_='playerSlot').text.strip()
+
+		playerInfo = row.find('td', class_='playertablePlayerName')
+		if playerInfo is None:
+			rows.append((label, None, u"", u"", u""))
+			continue
+
+		rows.append((label, playerInfo.a.text.strip(), playerInfo.text.strip(), row.find('td', class_='').text, row.find('td', class_='playertableStat').text))
+
+	return rows
+
+#
+# Return list of PlayerBoxScore row data from the given rows of GetTeamRows
+#
+def LoadStatsForTeam(playerRows, index, week, owners, teamNames, players, playerDraftMap, projections):
 
 	scoreRowData = []
 	iWeek = int(week) # needed as index into projections list
 
-	playerRows = playerTable.find_all('tr', class_='pncPlayerRow')
-		
-	for row in playerRows:
+	for label, playerName, playerInfoString, playerOpp, playerPoints in playerRows:
 		playerData = PlayerBoxScore()
 		playerData.week = week
 		playerData.owner = owners[index]
 		playerData.team = teamNames[index]
 		playerData.opponent = teamNames[(index+1)%2]
 
-		isDefense = False
-		isBench = False
-		slot = row.find('td', class_='playerSlot').text.strip()
-		if slot == 'RB/WR':
-			slot = 'FLEX'
-		elif slot == 'D/ST':
-			slot = 'DEF'
-			isDefense = True
-		elif slot == 'FLEX':
-			slot = 'EX-FLEX'
-		elif slot == 'Bench':
-			isBench = True
+		slot = SlotNames.get(label, label)
+		isBench = slot == 'Bench'
+		isDefense = GetSlotMask(slot) == PositionBits['Defense']
 
 		playerData.slot = slot
 
-		playerInfo = row.find('td', class_='playertablePlayerName')
-
 		# Some terrible human forgot to start anyone at all
-		if playerInfo is None:
+		if playerName is None:
 			scoreRowData.append(playerData)
 			continue
 
-		playerName = playerInfo.a.text.strip()
 		playerData.playerName = playerName
+		playerData.playerId = players.Intern(playerName)
 
 		if isDefense:
 			playerData.pos = "Defense"
 		else:
-			playerInfoString = playerInfo.text.strip()
 			if isBench and playerInfoString.find(",") == -1:
 				# Defenses on the bench have no commas
 				playerData.pos = "Defense"
@@ -672,29 +1749,28 @@ def LoadStatsForTeam(playerTable, index, week, owners, teamNames, playerDraftMap
 				playerData.playerTeam = details[0]
 				playerData.pos = details[1]
 
-		playerData.playerOpp = row.find('td', class_='').text
+		playerData.playerOpp = playerOpp
 
-		playerPoints = row.find('td', class_='playertableStat').text
 		try:
-			points = float(playerPoints)
+			points = ParsePoints(playerPoints)
 			playerData.points = points
 		except ValueError:
 			pass
 
-		draftInfo = ["", ""]
-
-		try:
-			draftInfo = playerDraftMap[playerName]
-		except KeyError:
-			pass
+		draftInfo = GetPlayerColumn(playerDraftMap, playerData.playerId)
+		players.RecordJoin("draft", draftInfo is not None)
+		if draftInfo is None:
+			draftInfo = ["", ""]
 
 		playerData.draftOwner = draftInfo[0]
 		playerData.draftAmount = draftInfo[1]
 		playerData.isBench = isBench
 
-		try:
-			playerData.projection = projections[playerName][iWeek-1]
-		except KeyError:
+		weeklyProjections = GetPlayerColumn(projections, playerData.playerId)
+		players.RecordJoin("projections", weeklyProjections is not None)
+		if weeklyProjections is not None:
+			playerData.projection = weeklyProjections[iWeek-1]
+		else:
 			print(week + " " + playerName)
 
 		scoreRowData.append(playerData)
@@ -724,7 +1800,7 @@ def UpdateStandings(owners, standings, totalWeekPoints):
 
 		oppOwnerIndex = (index+1) % 2
 
-		if round(totalWeekPoints[index],2) == round(totalWeekPoints[oppOwnerIndex],2):
+		if totalWeekPoints[index] == totalWeekPoints[oppOwnerIndex]:
 			ownerStandings.ties += 1
 		elif totalWeekPoints[index] > totalWeekPoints[oppOwnerIndex]:
 			ownerStandings.wins += 1
@@ -732,15 +1808,30 @@ def UpdateStandings(owners, standings, totalWeekPoints):
 			ownerStandings.losses += 1
 
 
-def LoadStatsForPage(htmlFile, results):
+#
+# week comes from the manifest when known
+# otherwise it is read from the page header
+# Pages outside of weeks (set of ints) are skipped
+#
+def LoadStatsForPage(htmlFile, results, week=None, weeks=None):
+	ParseStatsPage(open(htmlFile, "r").read(), results, week, weeks)
+
+#
+# Everything ParseStatsPage reads from a boxscore page
+# BeautifulSoup version of extract.ExtractBoxscore
+#
+# (page header, team names, owners, starter rows, bench rows)
+# with rows of each team as returned by GetTeamRows
+#
+def GetBoxscoreTables(html):
 
-	html = open(htmlFile, "r").read()
 	soup = BeautifulSoup(html, 'html.parser')
-  
-  	# get week
-  	week = soup.find('div', class_='games-pageheader').em.text[5:].strip()
 
-  	# get both players starting lineup tables
+	header = soup.find('div', class_='games-pageheader')
+	if header is not None:
+		header = header.em.text
+
+	# get both players starting lineup tables
 	players = soup.find_all('table', class_='playerTableTable tableBody')
 
 	# get both players bench tables
@@ -762,6 +1853,22 @@ def LoadStatsForPage(htmlFile, results):
 		owner = x[idx:idx2]
 		owners.append(owner)
 
+	return header, teamNames, owners, [ GetTeamRows(table) for table in players ], [ GetTeamRows(table) for table in benches ]
+
+def ParseStatsPage(html, results, week=None, weeks=None):
+
+	if UseStreamingExtractors:
+		header, teamNames, owners, players, benches = extract.ExtractBoxscore(html)
+	else:
+		header, teamNames, owners, players, benches = GetBoxscoreTables(html)
+
+	# get week
+	if week is None:
+		week = header[5:].strip()
+
+	if weeks is not None and int(week) not in weeks:
+		return
+
 	# total week points for each owner in same order as owner names
 	# totalWeekPoints[0]  total week points for starting lineups
 	# totalWeekPoints[1]  total week points for optimal lineups
@@ -769,10 +1876,10 @@ def LoadStatsForPage(htmlFile, results):
 	# totalWeekPoints[3]  total week points for owner[1] optimal standings
 	totalWeekPoints = [[0,0],[0,0],[0,0],[0,0]]
 
-	for index,playerTable in enumerate(players):
+	for index,playerRows in enumerate(players):
 
-		startingScoreRowData = LoadStatsForTeam(playerTable, index, week, owners, teamNames, results.playerDraftMap, results.projections)
-		benchScoreRowData = LoadStatsForTeam(benches[index], index, week, owners, teamNames, results.playerDraftMap, results.projections)
+		startingScoreRowData = LoadStatsForTeam(playerRows, index, week, owners, teamNames, results.players, results.playerDraftMap, results.projections)
+		benchScoreRowData = LoadStatsForTeam(benches[index], index, week, owners, teamNames, results.players, results.playerDraftMap, results.projections)
 
 		# Add all starting and bench players to player data
 		for row in startingScoreRowData:
@@ -805,8 +1912,42 @@ def LoadStatsForPage(htmlFile, results):
 	UpdateStandings(owners, results.standingsOptimal, totalWeekPoints[1])
 	UpdateIndividualOptimalStandings(owners, totalWeekPoints[0], totalWeekPoints[2], totalWeekPoints[3], results)
 
-def DownloadBoxscores(year):
-	schedulesContent = LoadContent(ScheduleUrl, "schedules", "schedules.html")
+BoxscoreManifestFile = "manifest.json"
+
+# Pull the teamId out of an espn link
+# Returns None when the link has no teamId
+def ParseTeamId(link):
+	idx = link.find("teamId=")
+	if idx == -1:
+		return None
+	link = link[idx+7:]
+	idxEnd = link.find('&')
+	if idxEnd == -1:
+		return link
+	return link[:idxEnd]
+
+# Owner cells either hold a 'team name (owner name)' link
+# or just the owner name
+def ParseOwnerFromCell(cell):
+	if cell.a is None or not cell.a.has_attr('title') or '(' not in cell.a['title']:
+		return cell.text.strip()
+	return ParseOwner(cell.a)
+
+#
+# Parse the schedule page into the boxscore manifest.
+#
+# The manifest lists one entry per matchup in week order:
+#	week, teamIds, owners, teams, url, file and sha1 of the page
+# so LoadStats never has to open a page to know its week.
+# sha1 is filled in once the page is downloaded.
+# None when the checkpoint quarantined the schedule page.
+#
+def ParseSchedule(results):
+	job = (GetScheduleUrl(results.leagueId, results.year), "schedules", "schedules.html", None)
+	return LoadIndexPage(job, lambda content, context: ParseScheduleContent(content, results), results.checkpoint)
+
+# The manifest for a schedule page that is already loaded
+def ParseScheduleContent(schedulesContent, results):
 	soup = BeautifulSoup(schedulesContent, 'html.parser')
 
 	tables = soup.find_all('table', class_='tableBody')
@@ -816,74 +1957,803 @@ def DownloadBoxscores(year):
 	tables = [table for table in tables if "leagueSettingsTable" not in table["class"] ]
 	table = tables[0]
 
-	# Filter out all non matchup rows from table
-	tableRows = table.find_all('tr')
-	matchupRows = [row for row in tableRows if 'class' not in row.attrs]
+	# Used when the schedule has no week headers
+	matchupsPerWeek = len(results.divisions["east"] + results.divisions["west"]) // 2
+	if matchupsPerWeek == 0:
+		matchupsPerWeek = 5
 
+	week = 0
 	matches = 0
+	manifest = []
+
+	for row in table.find_all('tr'):
 
-	for index,matchup in enumerate(matchupRows):
+		# Every week starts with a 'WEEK n' header row
+		# all other rows with a class are not matchups
+		if 'class' in row.attrs:
+			title = row.text.strip().upper().split()
+			if len(title) > 1 and title[0] == 'WEEK' and title[1].isdigit():
+				week = int(title[1])
+			continue
 
 		# There should be at least 5 table cells
-		cells = matchup.find_all('td')
+		cells = row.find_all('td')
 		if len(cells) < 5:
 			continue
 
-		scoringPeriodId = matches/5 + 1
+		scoringPeriodId = week
+		if scoringPeriodId == 0:
+			scoringPeriodId = matches // matchupsPerWeek + 1
 		matches += 1
 
 		# We only care about the regular season
 		if scoringPeriodId > 13:
-			break;
+			break
 
-		# Parse out the teamId
-		link = cells[0].a["href"]
-		teamIdIndex = link.index("teamId=")
-		link = link[teamIdIndex+7:]
-		teamId = link[:link.index('&')]
+		# The boxscore link holds the teamId used in the url
+		# other team links in the row hold the opponent's
+		teamId = ParseTeamId(cells[0].a["href"])
+		teamIds = [teamId]
+		for link in row.find_all('a', href=True):
+			otherTeamId = ParseTeamId(link["href"])
+			if otherTeamId is not None and otherTeamId not in teamIds:
+				teamIds.append(otherTeamId)
 
 		# Get Url and name the file
-		url = GetBoxScoreQuickUrl(teamId, scoringPeriodId, year)
+		url = GetBoxScoreQuickUrl(results.leagueId, teamId, scoringPeriodId, results.year)
 		filename = "week_" + str(scoringPeriodId) + ":_" + cells[1].text + "_vs_" + cells[4].text + ".html"
 
-		print("Downloading boxscore to file: " + filename)
-		print(url)
+		manifest.append({
+			"week" : scoringPeriodId,
+			"teamIds" : teamIds,
+			"owners" : [ParseOwnerFromCell(cells[1]), ParseOwnerFromCell(cells[4])],
+			"teams" : [cells[0].text.strip(), cells[3].text.strip()],
+			"url" : url,
+			"file" : filename,
+			"sha1" : ""
+		})
 
-		LoadContent(url, 'boxscores', filename)
+	manifest.sort(key=lambda entry: entry["week"])
+	return manifest
+
+#
+# Download every regular season boxscore and write the manifest
+# parse(content, entry) is called for each page as it arrives
+# Returns None when the schedule page was quarantined
+#
+def DownloadBoxscores(results, parse=None):
+	manifest = ParseSchedule(results)
+	if manifest is None:
+		return None
+
+	def downloaded(content, entry):
+		print("Downloaded boxscore to file: " + entry["file"])
+		entry["sha1"] = hashlib.sha1(content).hexdigest()
+		if parse is not None:
+			parse(content, entry)
+
+	jobs = [ (entry["url"], 'boxscores', entry["file"], entry) for entry in manifest ]
+	FetchAndParse(jobs, downloaded, results.checkpoint)
+
+	# Pages a resumed run skipped were parsed before
+	for entry in manifest:
+		filepath = 'boxscores/' + entry["file"]
+		if entry["sha1"] == "" and os.path.exists(filepath):
+			with open(filepath, "rb") as f:
+				entry["sha1"] = hashlib.sha1(f.read()).hexdigest()
+
+	WriteBoxscoreManifest('boxscores', manifest)
+	return manifest
+
+def WriteBoxscoreManifest(dirname, manifest):
+	with open(dirname + "/" + BoxscoreManifestFile, "w") as f:
+		json.dump(manifest, f, indent=1, sort_keys=True)
+
+# Raises ValueError when a cached page isn't the one the manifest recorded
+# Entries without a sha1 aren't checked
+def VerifyBoxscore(entry, content):
+	if entry.get("sha1", "") == "":
+		return
+	if hashlib.sha1(content).hexdigest() != entry["sha1"]:
+		raise ValueError(entry["file"] + " doesn't match the sha1 in the boxscore manifest, delete it to download it again")
+
+# Returns None if the directory has no manifest
+def LoadBoxscoreManifest(dirname):
+	filepath = dirname + "/" + BoxscoreManifestFile
+	if not os.path.exists(filepath):
+		return None
+	with open(filepath, "r") as f:
+		return json.load(f)
+
+# Parse weeks option like '3', '1-5' or '1,4,7-9' into a set of ints
+def ParseWeeks(arg):
+	weeks = set()
+	for part in arg.split(','):
+		if '-' in part:
+			first, last = part.split('-')
+			weeks.update(range(int(first), int(last)+1))
+		else:
+			weeks.add(int(part))
+	return weeks
+
+# Set of weeks back to the shortest weeks option, "" for None (all weeks)
+def FormatWeeks(weeks):
+	if weeks is None:
+		return ""
+
+	parts = []
+	for week in sorted(weeks):
+		if len(parts) > 0 and parts[-1][1] == week - 1:
+			parts[-1][1] = week
+		else:
+			parts.append([week, week])
+	return ",".join([ str(first) if first == last else str(first) + "-" + str(last) for first, last in parts ])
 
 '''
-Load stats for every single page found in directory
+Load stats for every boxscore page
+
+Pages come from the boxscore manifest in week order and
+are parsed while the next ones are being read or downloaded.
+Only pages in weeks (set of ints) get opened, all weeks if None.
+Every page is checked against the sha1 the manifest recorded for it.
+
+Directories without a manifest (like test) are listed instead,
+unless the boxscores can be found from the schedule: nothing is
+cached yet or the schedule is.
 '''
-def LoadStats(results, useTestDir):
+def LoadStats(results, useTestDir, weeks=None):
 
 	dirname = 'boxscores'
 	if useTestDir:
 		dirname = 'test'
+
+	def parse(content, entry):
+		if weeks is not None and entry["week"] not in weeks:
+			return
+		print(entry["file"])
+		VerifyBoxscore(entry, content)
+		ParseStatsPage(content, results, week=str(entry["week"]))
+
+	manifest = LoadBoxscoreManifest(dirname)
+	items = sorted([ item for item in os.listdir(dirname) if item.endswith(".html") or item.endswith(".htm") ])
+
+	# Without a manifest, parse the schedule and
+	# download all boxscores from espn. Cached pages are reused.
+	if manifest is None and not useTestDir and (len(items) == 0 or os.path.exists("schedules/schedules.html")):
+		DownloadBoxscores(results, parse)
+		return
+
+	if manifest is None:
+		jobs = [ (None, dirname, item, item) for item in items ]
+
+		def parseItem(content, item):
+			print(item)
+			ParseStatsPage(content, results, weeks=weeks)
+
+		FetchAndParse(jobs, parseItem, results.checkpoint)
+		return
+
+	jobs = [ (entry["url"], dirname, entry["file"], entry) for entry in manifest if weeks is None or entry["week"] in weeks ]
+	FetchAndParse(jobs, parse, results.checkpoint)
+
+#
+# Owner of every player for every week, built from acquisitions
+# Acquisitions for one player never overlap
+#
+class OwnershipIndex:
+	def __init__(self, acquisitions):
+
+		# playerId -> acquisitions of that player in week order
+		self.byPlayer = []
+
+		# playerId -> starting week of each of those acquisitions
+		self.startWeeks = []
+
+		for acquisition in acquisitions:
+			playerAcquisitions = GetPlayerColumn(self.byPlayer, acquisition.playerId)
+			if playerAcquisitions is None:
+				playerAcquisitions = []
+				SetPlayerColumn(self.byPlayer, acquisition.playerId, playerAcquisitions)
+				SetPlayerColumn(self.startWeeks, acquisition.playerId, [])
+
+			playerAcquisitions.append(acquisition)
+			self.startWeeks[acquisition.playerId].append(acquisition.week)
+
+	# Returns the Acquisition holding player in week or None
+	def Find(self, playerId, week):
+		startWeeks = GetPlayerColumn(self.startWeeks, playerId)
+		if startWeeks is None:
+			return None
+
+		index = bisect.bisect_right(startWeeks, week) - 1
+		if index < 0:
+			return None
+
+		acquisition = self.byPlayer[playerId][index]
+		if week > acquisition.endWeek:
+			return None
+		return acquisition
+
+	def Owner(self, playerId, week):
+		acquisition = self.Find(playerId, week)
+		if acquisition is None:
+			return None
+		return acquisition.owner
+
+LastRegularSeasonWeek = 13
+
+# Sort keys for ownership events in the same week.
+# The draft comes before every waiver move, then moves go in
+# date order. On the same date drops are processed before pickups
+# so a player dropped and picked up that day changes hands.
+DraftEvent = 0
+DropEvent = 1
+AddEvent = 2
+
+#
+# Turn the draft and waiver moves into ownership intervals
+#
+# Every event is sorted by (playerId, week, date, kind) and swept once.
+# A pickup closes the player's previous interval and opens a new one,
+# a drop closes the dropping owner's interval the week before it.
+# A player picked up and dropped in the same week keeps an interval
+# whose endWeek is before its week, so he was never owned for a game.
+#
+def BuildAcquisitions(results):
+
+	events = []
+	for draftInfo in results.allDraftData:
+		events.append((draftInfo.playerId, 1, "", DraftEvent, "draft", draftInfo.owner, int(draftInfo.draftAmount), draftInfo))
+
+	for move in results.waiverWireMoves:
+		# Moves after the regular season don't change any interval
+		if move.result == "Unsuccessful" or move.week > LastRegularSeasonWeek:
+			continue
+		if move.droppedPlayerId > -1:
+			events.append((move.droppedPlayerId, move.week, move.date, DropEvent, "waiver", move.owner, 0, move))
+		events.append((move.playerId, move.week, move.date, AddEvent, "waiver", move.owner, move.cost, move))
+
+	events.sort(key=lambda event: event[:4])
+
+	acquisitions = []
+	current = None
+	# A drop that came before the same owner's pickup on the same date
+	pendingDrop = None
+	for playerId, week, date, kind, source, owner, cost, row in events:
+		if current is not None and current.playerId != playerId:
+			current = None
+			pendingDrop = None
+
+		if kind == DropEvent:
+			if current is not None and current.owner == owner:
+				current.endWeek = week - 1
+				current = None
+			else:
+				pendingDrop = (owner, date)
+			continue
+
+		if current is not None:
+			current.endWeek = week - 1
+
+		current = Acquisition()
+		current.playerId = playerId
+		current.owner = owner
+		current.playerName = results.players.Name(playerId)
+		current.source = source
+		current.week = week
+		current.endWeek = LastRegularSeasonWeek
+		current.cost = cost
+		if source == "draft":
+			current.pos = row.pos
+		else:
+			current.pos = row.playerPos
+		acquisitions.append(current)
+
+		if pendingDrop == (owner, date):
+			current.endWeek = week - 1
+			current = None
+		pendingDrop = None
+
+	return acquisitions
+
+def PointsPerDollar(points, cost):
+	if cost <= 0:
+		return ""
+	# points are hundredths, so this is hundredths per dollar rounded half up
+	return FormatPoints((2 * points + cost) // (2 * cost))
+
+#
+# Join acquisitions against weekly production
+#
+# Both lists are sorted by (playerId, week) and walked together,
+# so each player's rows are visited once for all of that
+# player's acquisitions.
+#
+def CalculateAcquisitionRoi(results):
+
+	acquisitions = BuildAcquisitions(results)
+	rows = sorted([row for row in results.playerData if row.playerId > -1], key=lambda row: (row.playerId, int(row.week)))
+
+	rowIndex = 0
+	acquisitionIndex = 0
+	while acquisitionIndex < len(acquisitions):
+		playerId = acquisitions[acquisitionIndex].playerId
+
+		# Gather this player's acquisitions and weekly rows
+		acquisitionEnd = acquisitionIndex
+		while acquisitionEnd < len(acquisitions) and acquisitions[acquisitionEnd].playerId == playerId:
+			acquisitionEnd += 1
+
+		while rowIndex < len(rows) and rows[rowIndex].playerId < playerId:
+			rowIndex += 1
+		rowEnd = rowIndex
+		while rowEnd < len(rows) and rows[rowEnd].playerId == playerId:
+			rowEnd += 1
+
+		totalPoints = 0
+		for row in rows[rowIndex:rowEnd]:
+			totalPoints += row.points
+
+		# Rows and acquisitions are both in week order
+		# so the points seen so far only grow
+		pointsSoFar = 0
+		row = rowIndex
+		for acquisition in acquisitions[acquisitionIndex:acquisitionEnd]:
+			while row < rowEnd and int(rows[row].week) < acquisition.week:
+				pointsSoFar += rows[row].points
+				row += 1
+
+			while row < rowEnd and int(rows[row].week) <= acquisition.endWeek:
+				weekRow = rows[row]
+				acquisition.points += weekRow.points
+				if weekRow.owner == acquisition.owner and not weekRow.isBench:
+					acquisition.startedPoints += weekRow.points
+				pointsSoFar += weekRow.points
+				row += 1
+
+			if acquisition.endWeek < LastRegularSeasonWeek:
+				acquisition.pointsAfterDrop = totalPoints - pointsSoFar
+
+			acquisition.pointsPerDollar = PointsPerDollar(acquisition.points, acquisition.cost)
+			acquisition.startedPointsPerDollar = PointsPerDollar(acquisition.startedPoints, acquisition.cost)
+
+		acquisitionIndex = acquisitionEnd
+		rowIndex = rowEnd
+
+	results.acquisitions = acquisitions
+	results.ownership = OwnershipIndex(acquisitions)
+
+# Width in points of each projection calibration bucket
+ProjectionBucketSize = 5
+
+# Sums for one group of player weeks, in hundredths like the rows
+# [count, projected, points, error, absolute error, squared error]
+def AddProjectionError(totals, key, projected, points, error):
+	groupTotals = totals.get(key)
+	if groupTotals is None:
+		groupTotals = [0, 0, 0, 0, 0, 0]
+		totals[key] = groupTotals
+
+	groupTotals[0] += 1
+	groupTotals[1] += projected
+	groupTotals[2] += points
+	groupTotals[3] += error
+	groupTotals[4] += abs(error)
+	groupTotals[5] += error * error
+
+# Mean of count scores summed in hundredths, as points
+# rounded half up to hundredths like PointsPerDollar
+def MeanPoints(total, count):
+	return FormatPoints((2 * total + count) // (2 * count))
+
+def GetProjectionAccuracy(group, pos, groupTotals):
+	count, projected, points, error, absError, squaredError = groupTotals
+
+	accuracy = ProjectionAccuracy()
+	accuracy.group = group
+	accuracy.pos = pos
+	accuracy.count = count
+	accuracy.projected = MeanPoints(projected, count)
+	accuracy.points = MeanPoints(points, count)
+	accuracy.bias = MeanPoints(error, count)
+	accuracy.meanAbsError = MeanPoints(absError, count)
+	# squaredError is in hundredths squared
+	accuracy.rmse = round(Decimal(math.sqrt(squaredError / float(count)) / PointsScale), 2)
+	return accuracy
+
+def GetProjectionCalibration(group, pos, bucket, groupTotals):
+	count, projected, points = groupTotals[:3]
+
+	calibration = ProjectionCalibration()
+	calibration.group = group
+	calibration.pos = pos
+	calibration.bucketLow = bucket * ProjectionBucketSize
+	calibration.bucketHigh = (bucket+1) * ProjectionBucketSize
+	calibration.count = count
+	calibration.projected = MeanPoints(projected, count)
+	calibration.points = MeanPoints(points, count)
+	return calibration
+
+#
+# Projection error, bias and calibration over the whole season
+#
+# Every player week with a projection is summed per player, position
+# and week. Calibration buckets are summed over the whole season and
+# within each player, position and week.
+#
+def CalculateProjectionAccuracy(results):
+
+	# Last position each player was seen at
+	positions = {}
+
+	playerTotals = {}
+	positionTotals = {}
+	weekTotals = {}
+
+	# keyed by (group, bucket), group is None for the whole season
+	bucketTotals = {}
+	playerBucketTotals = {}
+	positionBucketTotals = {}
+	weekBucketTotals = {}
+
+	for row in results.playerData:
+		if GetPlayerColumn(results.projections, row.playerId) is None:
+			continue
+
+		projected = row.projection
+		points = row.points
+		error = points - projected
+		week = int(row.week)
+		bucket = max(0, projected // (ProjectionBucketSize * PointsScale))
+		positions[row.playerId] = row.pos
+
+		AddProjectionError(playerTotals, row.playerId, projected, points, error)
+		AddProjectionError(positionTotals, row.pos, projected, points, error)
+		AddProjectionError(weekTotals, week, projected, points, error)
+
+		AddProjectionError(bucketTotals, (None, bucket), projected, points, error)
+		AddProjectionError(playerBucketTotals, (row.playerId, bucket), projected, points, error)
+		AddProjectionError(positionBucketTotals, (row.pos, bucket), projected, points, error)
+		AddProjectionError(weekBucketTotals, (week, bucket), projected, points, error)
+
+	results.projectionAccuracyPlayers = [ GetProjectionAccuracy(results.players.Name(playerId), positions[playerId], playerTotals[playerId]) for playerId in sorted(playerTotals) ]
+	results.projectionAccuracyPositions = [ GetProjectionAccuracy(pos, pos, positionTotals[pos]) for pos in sorted(positionTotals) ]
+	results.projectionAccuracyWeeks = [ GetProjectionAccuracy(week, "", weekTotals[week]) for week in sorted(weekTotals) ]
+
+	results.projectionCalibration = [ GetProjectionCalibration("", "", key[1], bucketTotals[key]) for key in sorted(bucketTotals) ]
+	results.projectionCalibrationPlayers = [ GetProjectionCalibration(results.players.Name(key[0]), positions[key[0]], key[1], playerBucketTotals[key]) for key in sorted(playerBucketTotals) ]
+	results.projectionCalibrationPositions = [ GetProjectionCalibration(key[0], key[0], key[1], positionBucketTotals[key]) for key in sorted(positionBucketTotals) ]
+	results.projectionCalibrationWeeks = [ GetProjectionCalibration(key[0], "", key[1], weekBucketTotals[key]) for key in sorted(weekBucketTotals) ]
+
+	# Did owners do better or worse than just following the projections
+	records = {}
+	for comparison in results.lineupComparisons:
+		record = records.get(comparison.owner)
+		if record is None:
+			record = ProjectionLineupRecord()
+			record.owner = comparison.owner
+			records[comparison.owner] = record
+
+		if comparison.points == comparison.projectedLineupPoints:
+			record.tied += 1
+		elif comparison.points > comparison.projectedLineupPoints:
+			record.beat += 1
+		else:
+			record.trailed += 1
+		record.pointsVsProjectedLineup += comparison.points - comparison.projectedLineupPoints
+
+	results.projectionLineupRecords = [ records[owner] for owner in sorted(records) ]
+
+#
+# Everything computed from the parsed pages
+# Runs once every page of the season is in results
+#
+#
+# Stages intern players from several threads at once, so ids depend on
+# which page got parsed first. Renumbering them in name order before
+# anything gets sorted by id keeps every output the same from run to run.
+#
+def RenumberPlayers(results):
+	newIds = results.players.Renumber()
+	results.playerDraftMap = RemapPlayerColumn(results.playerDraftMap, newIds)
+	results.projections = RemapPlayerColumn(results.projections, newIds)
+	for table, rowClass, field in SnapshotRowTables:
+		RemapRowPlayerIds(getattr(results, field), newIds)
+
+def FinishResults(results):
+	RenumberPlayers(results)
+
+	# Report how well players joined across pages
+	results.players.Report()
+
+	# Join draft and waiver pickups against weekly points
+	CalculateAcquisitionRoi(results)
+
+	# Projection optimal and points optimal lineups for every team week
+	CalculateLineups(results)
+
+	# How good were the projections
+	CalculateProjectionAccuracy(results)
+
+	# calculate playoff teams for all standings
+	results.CalculatePlayoffTeams()
+
+#
+# Season snapshot
+#
+# Every field of Results is stored as a table of columns, see snapshot.py.
+# Loading one rebuilds Results without parsing any page.
+#
+
+# Hidden attributes like playerId are stored with a leading '.'
+def RowDataColumns(rows):
+	if len(rows) == 0:
+		return []
+
+	attrs = rows[0].attrs
+	hidden = sorted([ attr for attr in rows[0].__dict__ if attr not in ("values", "attrs") ])
+
+	columns = [ (attr, [ row.values[i] for row in rows ]) for i,attr in enumerate(attrs) ]
+	columns += [ ("." + attr, [ row.__dict__[attr] for row in rows ]) for attr in hidden ]
+	return columns
+
+def RowDataFromColumns(rowClass, columns):
+	attrs = [ name for name,values in columns if not name.startswith(".") ]
+	attrColumns = [ values for name,values in columns if not name.startswith(".") ]
+	hiddenColumns = [ (name[1:], values) for name,values in columns if name.startswith(".") ]
+
+	rows = []
+	rowCount = 0
+	if len(columns) > 0:
+		rowCount = len(columns[0][1])
+
+	for i in range(rowCount):
+		# Skip the constructor, values come straight from the columns
+		row = rowClass.__new__(rowClass)
+		for name, values in hiddenColumns:
+			row.__dict__[name] = values[i]
+		row.__dict__["values"] = [ values[i] for values in attrColumns ]
+		row.__dict__["attrs"] = attrs
+		rows.append(row)
+
+	return rows
+
+SnapshotRowTables = [
+	("draft", PlayerDraftInfo, "allDraftData"),
+	("playerData", PlayerBoxScore, "playerData"),
+	("waiverMoves", WaiverWireMove, "waiverWireMoves"),
+	("wrongDecisionsAll", WrongDecision, "wrongDecisionsAll"),
+	("wrongDecisionsOptimal", WrongDecision, "wrongDecisionsOptimal"),
+	("projectionUpsetDecisions", ProjectionUpsetDecision, "projectionUpsetDecisions"),
+	("acquisitions", Acquisition, "acquisitions"),
+	("lineupComparisons", LineupComparison, "lineupComparisons"),
+	("projectionAccuracyPlayers", ProjectionAccuracy, "projectionAccuracyPlayers"),
+	("projectionAccuracyPositions", ProjectionAccuracy, "projectionAccuracyPositions"),
+	("projectionAccuracyWeeks", ProjectionAccuracy, "projectionAccuracyWeeks"),
+	("projectionCalibration", ProjectionCalibration, "projectionCalibration"),
+	("projectionCalibrationPlayers", ProjectionCalibration, "projectionCalibrationPlayers"),
+	("projectionCalibrationPositions", ProjectionCalibration, "projectionCalibrationPositions"),
+	("projectionCalibrationWeeks", ProjectionCalibration, "projectionCalibrationWeeks"),
+	("projectionLineupRecords", ProjectionLineupRecord, "projectionLineupRecords")
+]
+
+# tables is a list of (name, columns) stored along with results
+def SaveResults(results, path, tables=[]):
+	writer = snapshot.SnapshotWriter()
+
+	writer.AddTable("meta", [("year", [results.year]), ("leagueId", [results.leagueId]), ("pointsScale", [PointsScale])])
+	writer.AddTable("players", [("name", results.players.names)])
+
+	sources = sorted(results.players.joins)
+	writer.AddTable("joins", [
+		("source", sources),
+		("lookups", [ results.players.joins[source][0] for source in sources ]),
+		("misses", [ results.players.joins[source][1] for source in sources ])
+	])
+
+	collisions = [ (key, spelling) for key in sorted(results.players.collisions) for spelling in sorted(results.players.collisions[key]) ]
+	writer.AddTable("nameCollisions", [
+		("key", [ collision[0] for collision in collisions ]),
+		("spelling", [ collision[1] for collision in collisions ])
+	])
+
+	labels = sorted(RosterSlots)
+	writer.AddTable("rosterSlots", [
+		("label", labels),
+		("slot", [ RosterSlots[label][0] for label in labels ]),
+		("positions", [ ",".join(RosterSlots[label][1]) for label in labels ])
+	])
+
+	divisions = sorted(results.divisions)
+	writer.AddTable("divisions", [
+		("division", [ division for division in divisions for owner in results.divisions[division] ]),
+		("owner", [ owner for division in divisions for owner in results.divisions[division] ])
+	])
+
+	drafted = [ playerId for playerId,draftInfo in enumerate(results.playerDraftMap) if draftInfo is not None ]
+	writer.AddTable("draftMap", [
+		("playerId", drafted),
+		("owner", [ results.playerDraftMap[playerId][0] for playerId in drafted ]),
+		("amount", [ results.playerDraftMap[playerId][1] for playerId in drafted ])
+	])
+
+	projected = [ playerId for playerId,weeklyProjections in enumerate(results.projections) if weeklyProjections is not None ]
+	columns = [("playerId", projected)]
+	for week in range(13):
+		columns.append(("week" + str(week+1), [ results.projections[playerId][week] for playerId in projected ]))
+	writer.AddTable("projections", columns)
+
+	for table, rowClass, field in SnapshotRowTables:
+		writer.AddTable(table, RowDataColumns(getattr(results, field)))
+
+	# group is the Results field each standing belongs to
+	# and optimalOwner is only set for individual optimal standings
+	standings = []
+	for owner in results.standings:
+		standings.append(("standings", "", owner, results.standings[owner]))
+	for owner in results.standingsOptimal:
+		standings.append(("standingsOptimal", "", owner, results.standingsOptimal[owner]))
+	for owner in results.standingsProjected:
+		standings.append(("standingsProjected", "", owner, results.standingsProjected[owner]))
+	for optimalOwner in results.standingsIndividualOptimal:
+		for owner in results.standingsIndividualOptimal[optimalOwner]:
+			standings.append(("standingsIndividualOptimal", optimalOwner, owner, results.standingsIndividualOptimal[optimalOwner][owner]))
+
+	writer.AddTable("standings", [
+		("group", [ row[0] for row in standings ]),
+		("optimalOwner", [ row[1] for row in standings ]),
+		("owner", [ row[2] for row in standings ]),
+		("wins", [ row[3].wins for row in standings ]),
+		("losses", [ row[3].losses for row in standings ]),
+		("ties", [ row[3].ties for row in standings ]),
+		("points", [ row[3].points for row in standings ]),
+		("madePlayoffs", [ row[3].madePlayoffs for row in standings ])
+	])
+
+	for name, columns in tables:
+		writer.AddTable(name, columns)
+
+	writer.Write(path)
+
+def LoadResults(path):
+	snap = snapshot.Snapshot(path)
+	results = Results()
+
+	def table(name):
+		return dict(snap.Columns(name))
+
+	meta = table("meta")
+	if meta.get("pointsScale", [None])[0] != PointsScale:
+		raise ValueError(path + " was written by an older scrape.py, run it again to rebuild the snapshot")
+
+	results.year = meta["year"][0]
+	# Snapshots from before leagues could be chosen are of the default one
+	results.leagueId = meta.get("leagueId", [DefaultLeagueId])[0]
+
+	# Snapshots from before roster slots were saved keep the ones in use
+	if snap.HasTable("rosterSlots"):
+		rosterSlots = table("rosterSlots")
+		SetRosterSlots(dict([ (label, [rosterSlots["slot"][i], rosterSlots["positions"][i].split(",")]) for i,label in enumerate(rosterSlots["label"]) ]))
+
+	for name in table("players")["name"]:
+		results.players.Intern(name)
+
+	joins = table("joins")
+	for i,source in enumerate(joins.get("source", [])):
+		results.players.joins[source] = [joins["lookups"][i], joins["misses"][i]]
+
+	# Snapshots from before collisions were kept have none
+	if snap.HasTable("nameCollisions"):
+		collisions = table("nameCollisions")
+		for i,key in enumerate(collisions["key"]):
+			results.players.AddCollision(key, [collisions["spelling"][i]])
+
+	divisions = table("divisions")
+	for i,division in enumerate(divisions.get("division", [])):
+		results.divisions.setdefault(division, []).append(divisions["owner"][i])
+
+	draftMap = table("draftMap")
+	for i,playerId in enumerate(draftMap.get("playerId", [])):
+		SetPlayerColumn(results.playerDraftMap, playerId, [draftMap["owner"][i], draftMap["amount"][i]])
+
+	projections = table("projections")
+	for i,playerId in enumerate(projections.get("playerId", [])):
+		SetPlayerColumn(results.projections, playerId, [ projections["week" + str(week+1)][i] for week in range(13) ])
+
+	# Tables added since the snapshot was written stay empty
+	for name, rowClass, field in SnapshotRowTables:
+		if snap.HasTable(name):
+			setattr(results, field, RowDataFromColumns(rowClass, snap.Columns(name)))
+
+	standings = table("standings")
+	for i,group in enumerate(standings.get("group", [])):
+		standing = Standing()
+		standing.wins = standings["wins"][i]
+		standing.losses = standings["losses"][i]
+		standing.ties = standings["ties"][i]
+		standing.points = standings["points"][i]
+		standing.madePlayoffs = standings["madePlayoffs"][i]
+
+		owner = standings["owner"][i]
+		if group == "standingsIndividualOptimal":
+			results.standingsIndividualOptimal.setdefault(standings["optimalOwner"][i], {})[owner] = standing
+		else:
+			getattr(results, group)[owner] = standing
+
+	results.ownership = OwnershipIndex(results.acquisitions)
+
+	snap.Close()
+	return results
+
+SeasonSnapshotFile = "results/season.snap"
+
+# query is 'player name:week'
+def PrintOwner(results, query):
+	idx = query.rfind(':')
+	playerName = query[:idx]
+	week = int(query[idx+1:])
+
+	owner = results.ownership.Owner(results.players.Find(playerName), week)
+	if owner is None:
+		owner = "nobody"
+	print(playerName + " week " + str(week) + ": " + owner)
+
+#
+# Parse every page in a cache directory with both BeautifulSoup and
+# the streaming extractors and print every page where they disagree
+# The page type comes from the directory name like in CompactFragments
+#
+def VerifyExtractors(dirname):
+	name = os.path.basename(os.path.normpath(dirname))
+	if name == "projections":
+		extractors = (GetProjectionRows, extract.ExtractProjections)
+	elif name == "draft":
+		extractors = (GetDraftRows, extract.ExtractDraft)
+	elif name == "waivers":
+		extractors = (GetWaiverRows, extract.ExtractWaivers)
 	else:
-		# if there are no files in boxscores directory
-		# download all boxscores from espn
-		if (len(glob.glob(dirname +"/*.html")) + len(glob.glob(dirname +"/*.htm"))) == 0:
-			DownloadBoxscores(results.year)
+		extractors = (GetBoxscoreTables, extract.ExtractBoxscore)
 
-	for item in os.listdir(dirname):
-		if not item.endswith(".html") and not item.endswith(".htm"):
+	pages = 0
+	mismatches = 0
+	for item in sorted(os.listdir(dirname)):
+		if not (item.endswith(".html") or item.endswith(".htm")):
 			continue
 
-		print(item)
-		LoadStatsForPage(dirname+'/'+item, results)
+		with open(os.path.join(dirname, item), "rb") as f:
+			content = f.read()
+
+		expected = extractors[0](content)
+		actual = extractors[1](content)
+		if not isinstance(actual, tuple):
+			expected = list(expected)
+			actual = list(actual)
+
+		pages += 1
+		if expected != actual:
+			mismatches += 1
+			print("Mismatch in " + item)
+
+	print(str(pages) + " pages, " + str(mismatches) + " mismatches")
+	return mismatches == 0
 
 def RunCommand(command):
 	subprocess.Popen(command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
 
 def main(argv):
 	try:
-		opts, args = getopt.getopt(argv,"try:f")
+		opts, args = getopt.getopt(argv,"try:fl:q:w:s:i:x:u:", ["resume"])
 	except getopt.GetoptError:
-		print("scrape.py -t [use test dir] -r [cleans all results] -f [cleans all files] -y [year]")
+		print("scrape.py -t [use test dir] -r [cleans all results] -f [cleans all files] -y [year] -l [load snapshot file] -q [player:week] -w [weeks like 1-5] -s [roster slots json] -i [league id] -x [cache dir to verify extractors on] -u [espn host like http://localhost:8000] --resume [continue from the last checkpoint]")
 		sys.exit(2)
 
 	year = 2016 # 2016 is the default. First year of stats.
+	leagueId = DefaultLeagueId
 	useTestDir = False
+	weeks = None
+	snapshotFile = None
+	query = None
+	resume = False
 	for opt, arg in opts:
 		if opt == '-t':
 			useTestDir = True
@@ -898,6 +2768,23 @@ def main(argv):
 			except ValueError:
 				print("Using year 2016 because you gave a faulty year")
 				pass
+		elif opt == '-w':
+			weeks = ParseWeeks(arg)
+		elif opt == '-l':
+			snapshotFile = arg
+		elif opt == '-q':
+			query = arg
+		elif opt == '-s':
+			LoadRosterSlots(arg)
+		elif opt == '-i':
+			leagueId = arg
+		elif opt == '-u':
+			SetEspnHost(arg)
+		elif opt == '--resume':
+			resume = True
+		elif opt == '-x':
+			# This option will terminate program after verifying
+			sys.exit(0 if VerifyExtractors(arg) else 1)
 		elif opt == '-f':
 			# This option will terminate program after cleaning
 			# This option removes all files from the results folder.
@@ -911,29 +2798,77 @@ def main(argv):
 			sys.exit(2)
 
 
-	results = Results()
-	results.year = year
+	if snapshotFile is not None:
+		# Skip every loader and reuse a finished season
+		results = LoadResults(snapshotFile)
+	else:
+		if resume and os.path.exists(CheckpointFile):
+			checkpoint = LoadCheckpoint(CheckpointFile)
+			results = checkpoint.results
+			if results.year != year or results.leagueId != leagueId:
+				print(CheckpointFile + " is for " + str(results.leagueId) + " " + str(results.year) + ", give its -i and -y to resume it")
+				sys.exit(2)
+			if checkpoint.weeks != FormatWeeks(weeks):
+				print(CheckpointFile + " is for " + (("weeks " + checkpoint.weeks) if checkpoint.weeks != "" else "all weeks") + ", give the same -w to resume it")
+				sys.exit(2)
+			print("Resuming with " + str(len(checkpoint.stages)) + " stages and " + str(len(checkpoint.pages)) + " pages done")
+		else:
+			results = Results()
+			results.year = year
+			results.leagueId = leagueId
+			checkpoint = Checkpoint(CheckpointFile, results)
+			checkpoint.weeks = FormatWeeks(weeks)
 
-	# Load all divisions and owners
-	LoadDivisions(results)
+		results.checkpoint = checkpoint
 
-	# Load all draft information
-	LoadDraft(results)
+		# Stages that don't depend on each other all run at once
 
-	# Load all weekly projections for each player
-	LoadProjections(results)
+		# Load all divisions and owners
+		divisions = Stage(checkpoint.RunStage, "divisions", LoadDivisions, results)
 
-	# Load all waiver wire and auction information
-	LoadWaiverWire(results)
+		# Load all draft information
+		draft = Stage(checkpoint.RunStage, "draft", LoadDraft, results)
 
-	# Get all boxscore data and store in results
-	LoadStats(results, useTestDir)
+		# Load all weekly projections for each player
+		projections = Stage(checkpoint.RunStage, "projections", LoadProjections, results)
 
-	# calculate playoff teams for all standings
-	results.CalculatePlayoffTeams()
+		# Load all waiver wire and auction information
+		waivers = Stage(checkpoint.RunStage, "waivers", LoadWaiverWire, results)
+
+		# Boxscores need the owners, draft amounts and projections
+		divisions.Wait()
+		draft.Wait()
+		projections.Wait()
+
+		# Get all boxscore data and store in results
+		# A run over some weeks only finishes the stage for those weeks
+		boxscores = "boxscores"
+		if weeks is not None:
+			boxscores += " " + FormatWeeks(weeks)
+		if all([ checkpoint.IsStageDone(name) for name in ["divisions", "draft", "projections"] ]):
+			checkpoint.RunStage(boxscores, LoadStats, results, useTestDir, weeks)
+
+		waivers.Wait()
+
+		if checkpoint.failures > 0:
+			print(str(checkpoint.failures) + " pages were quarantined, see " + ErrorLogFile)
+
+		# Finishing needs every stage
+		unfinished = [ name for name in ["divisions", "draft", "projections", "waivers", boxscores] if not checkpoint.IsStageDone(name) ]
+		if len(unfinished) > 0:
+			print("Stopping with unfinished stages: " + ", ".join(unfinished) + ". Delete or fix the quarantined pages and run again with --resume")
+			sys.exit(1)
+
+		FinishResults(results)
+
+		# Keep the finished season so it reloads without parsing any page
+		SaveResults(results, SeasonSnapshotFile)
 
 	# Write all of the results out to csv files
 	results.Output()
+
+	if query is not None:
+		PrintOwner(results, query)
                              
 if __name__ == '__main__':
     main(sys.argv[1:])
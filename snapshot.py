@@ -0,0 +1,263 @@
+from decimal import Decimal
+import mmap
+import numbers
+import struct
+
+'''
+Binary snapshot of named tables of columns.
+
+Layout, all little endian:
+
+	header       magic, table count, string count, string table offset
+	directory    per table: name, row count, column count
+	             then per column: name, type code, data offset
+	column data  one fixed width array per column, 8 byte aligned
+	string table string count + 1 offsets followed by utf-8 bytes
+
+Every string (table names, column names and values) is stored once
+in the string table and referenced by index, so the file is read
+by memory mapping it and unpacking whole columns at once.
+'''
+
+Magic = b"FFSNAP01"
+
+HeaderFormat = "<8sIIQ"
+TableFormat = "<III"
+ColumnFormat = "<IcxxxQ"
+
+# Column type codes and the struct code of one value
+IntColumn = b"q"
+FloatColumn = b"d"
+BoolColumn = b"B"
+StringColumn = b"S"
+DecimalColumn = b"D"
+VariantColumn = b"V"
+
+ValueFormats = { IntColumn : "q", FloatColumn : "d", BoolColumn : "B", StringColumn : "I", DecimalColumn : "I", VariantColumn : "I" }
+
+# Strings come back as str on both python 2 and 3
+if str is bytes:
+	def DecodeString(data):
+		return data
+else:
+	def DecodeString(data):
+		return data.decode('utf-8')
+
+def EncodeString(value):
+	if isinstance(value, bytes):
+		return value
+	return value.encode('utf-8')
+
+def IsInt(value):
+	return isinstance(value, numbers.Integral) and not isinstance(value, bool)
+
+def IsString(value):
+	return isinstance(value, (bytes, type(u"")))
+
+# Pick the narrowest column type holding every value.
+# Columns mixing types keep each value's type in a tagged string.
+def GetColumnType(values):
+	if all(isinstance(value, bool) for value in values):
+		return BoolColumn
+	if all(IsInt(value) for value in values):
+		return IntColumn
+	if all(isinstance(value, float) for value in values):
+		return FloatColumn
+	if all(IsString(value) for value in values):
+		return StringColumn
+	if all(isinstance(value, Decimal) for value in values):
+		return DecimalColumn
+	return VariantColumn
+
+def EncodeVariant(value):
+	if value is None:
+		return "n:"
+	if isinstance(value, bool):
+		return "b:" + str(int(value))
+	if IsInt(value):
+		return "i:" + str(value)
+	if isinstance(value, float):
+		return "f:" + repr(value)
+	if isinstance(value, Decimal):
+		return "D:" + str(value)
+	if isinstance(value, bytes):
+		return b"s:" + value
+	return u"s:" + value
+
+def DecodeVariant(text):
+	tag = text[:2]
+	value = text[2:]
+	if tag == "n:":
+		return None
+	if tag == "b:":
+		return value == "1"
+	if tag == "i:":
+		return int(value)
+	if tag == "f:":
+		return float(value)
+	if tag == "D:":
+		return Decimal(value)
+	return value
+
+'''
+Collects tables and writes them out in one go
+'''
+class SnapshotWriter:
+	def __init__(self):
+
+		# list of encoded strings, index is the string id
+		self.strings = []
+
+		# encoded string -> string id
+		self.stringIds = {}
+
+		# list of [table name, row count, [(column name, type, values)]]
+		self.tables = []
+
+	def String(self, value):
+		data = EncodeString(value)
+		try:
+			return self.stringIds[data]
+		except KeyError:
+			self.stringIds[data] = len(self.strings)
+			self.strings.append(data)
+			return self.stringIds[data]
+
+	# columns is a list of (column name, list of values)
+	# and every list of values must be the same length
+	def AddTable(self, name, columns):
+		rowCount = 0
+		if len(columns) > 0:
+			rowCount = len(columns[0][1])
+
+		typedColumns = []
+		for columnName, values in columns:
+			if len(values) != rowCount:
+				raise ValueError("column " + columnName + " of " + name + " has the wrong length")
+			typedColumns.append((columnName, GetColumnType(values), values))
+
+		self.tables.append([name, rowCount, typedColumns])
+
+	def packColumn(self, columnType, values):
+		if columnType in (StringColumn, DecimalColumn):
+			values = [ self.String(str(value) if columnType == DecimalColumn else value) for value in values ]
+		elif columnType == VariantColumn:
+			values = [ self.String(EncodeVariant(value)) for value in values ]
+		elif columnType == BoolColumn:
+			values = [ int(value) for value in values ]
+
+		return struct.pack("<" + str(len(values)) + ValueFormats[columnType], *values)
+
+	def Write(self, path):
+
+		# Pack every column first so all strings are known
+		blobs = []
+		for name, rowCount, columns in self.tables:
+			self.String(name)
+			for columnName, columnType, values in columns:
+				self.String(columnName)
+				blobs.append(self.packColumn(columnType, values))
+
+		directorySize = 0
+		for name, rowCount, columns in self.tables:
+			directorySize += struct.calcsize(TableFormat) + len(columns) * struct.calcsize(ColumnFormat)
+
+		offset = Align(struct.calcsize(HeaderFormat) + directorySize)
+		directory = []
+		blobIndex = 0
+		for name, rowCount, columns in self.tables:
+			directory.append(struct.pack(TableFormat, self.String(name), rowCount, len(columns)))
+			for columnName, columnType, values in columns:
+				directory.append(struct.pack(ColumnFormat, self.String(columnName), columnType, offset))
+				offset = Align(offset + len(blobs[blobIndex]))
+				blobIndex += 1
+
+		stringTableOffset = offset
+		stringOffsets = [0]
+		for data in self.strings:
+			stringOffsets.append(stringOffsets[-1] + len(data))
+
+		with open(path, "wb") as f:
+			f.write(struct.pack(HeaderFormat, Magic, len(self.tables), len(self.strings), stringTableOffset))
+			for entry in directory:
+				f.write(entry)
+			for blob in blobs:
+				f.write(b"\0" * (Align(f.tell()) - f.tell()))
+				f.write(blob)
+			f.write(b"\0" * (stringTableOffset - f.tell()))
+			f.write(struct.pack("<" + str(len(stringOffsets)) + "Q", *stringOffsets))
+			f.write(b"".join(self.strings))
+
+def Align(offset):
+	return (offset + 7) & ~7
+
+'''
+Memory mapped reader for a file written by SnapshotWriter.
+Columns are only unpacked when asked for.
+'''
+class Snapshot:
+	def __init__(self, path):
+		self.file = open(path, "rb")
+		self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+
+		magic, tableCount, stringCount, stringTableOffset = struct.unpack_from(HeaderFormat, self.map, 0)
+		if magic != Magic:
+			raise ValueError(path + " is not a season snapshot")
+
+		self.stringCount = stringCount
+		self.stringOffsets = struct.unpack_from("<" + str(stringCount+1) + "Q", self.map, stringTableOffset)
+		self.stringDataOffset = stringTableOffset + 8 * (stringCount+1)
+		self.decodedStrings = [None] * stringCount
+
+		# table name -> [row count, [(column name, type, offset)]]
+		self.tables = {}
+
+		offset = struct.calcsize(HeaderFormat)
+		for i in range(tableCount):
+			nameIndex, rowCount, columnCount = struct.unpack_from(TableFormat, self.map, offset)
+			offset += struct.calcsize(TableFormat)
+
+			columns = []
+			for j in range(columnCount):
+				columnNameIndex, columnType, dataOffset = struct.unpack_from(ColumnFormat, self.map, offset)
+				offset += struct.calcsize(ColumnFormat)
+				columns.append((self.String(columnNameIndex), columnType, dataOffset))
+
+			self.tables[self.String(nameIndex)] = [rowCount, columns]
+
+	def String(self, index):
+		value = self.decodedStrings[index]
+		if value is None:
+			start = self.stringDataOffset + self.stringOffsets[index]
+			end = self.stringDataOffset + self.stringOffsets[index+1]
+			value = DecodeString(self.map[start:end])
+			self.decodedStrings[index] = value
+		return value
+
+	def HasTable(self, name):
+		return name in self.tables
+
+	def RowCount(self, name):
+		return self.tables[name][0]
+
+	# Returns list of (column name, list of values) like SnapshotWriter.AddTable
+	def Columns(self, name):
+		rowCount, columns = self.tables[name]
+		return [ (columnName, self.unpackColumn(columnType, dataOffset, rowCount)) for columnName, columnType, dataOffset in columns ]
+
+	def unpackColumn(self, columnType, dataOffset, rowCount):
+		values = struct.unpack_from("<" + str(rowCount) + ValueFormats[columnType], self.map, dataOffset)
+
+		if columnType == StringColumn:
+			return [ self.String(index) for index in values ]
+		if columnType == DecimalColumn:
+			return [ Decimal(self.String(index)) for index in values ]
+		if columnType == VariantColumn:
+			return [ DecodeVariant(self.String(index)) for index in values ]
+		if columnType == BoolColumn:
+			return [ value == 1 for value in values ]
+		return list(values)
+
+	def Close(self):
+		self.map.close()
+		self.file.close()
@@ -0,0 +1,93 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import scrape
+
+'''
+Ownership intervals built from the draft and the waiver moves
+'''
+
+def Draft(results, owner, name, amount):
+	draftInfo = scrape.PlayerDraftInfo()
+	draftInfo.owner = owner
+	draftInfo.playerName = name
+	draftInfo.pos = "RB"
+	draftInfo.draftAmount = str(amount)
+	draftInfo.playerId = results.players.Intern(name)
+	results.allDraftData.append(draftInfo)
+
+def Move(results, date, owner, name, cost, droppedName=None):
+	move = scrape.WaiverWireMove()
+	move.date = date
+	move.week = scrape.GetWeekForDate(results.year, date)
+	move.owner = owner
+	move.playerName = name
+	move.playerPos = "WR"
+	move.playerId = results.players.Intern(name)
+	move.cost = cost
+	move.result = "Added"
+	if droppedName is not None:
+		move.droppedPlayerName = droppedName
+		move.droppedPlayerId = results.players.Intern(droppedName)
+	results.waiverWireMoves.append(move)
+
+class AcquisitionTest(unittest.TestCase):
+
+	def setUp(self):
+		self.results = scrape.Results()
+		self.results.year = 2016
+		mondays = scrape.MondayDates["2016"]
+		self.firstWeek = mondays[0]
+		self.sixthWeek = mondays[5]
+
+	def index(self):
+		return scrape.OwnershipIndex(scrape.BuildAcquisitions(self.results))
+
+	def testDraftDroppedInFirstWeek(self):
+		Draft(self.results, "A", "Player X", 10)
+		Move(self.results, self.firstWeek, "A", "Player Y", 0, "Player X")
+
+		self.assertEqual(scrape.GetWeekForDate(2016, self.firstWeek), 1)
+		index = self.index()
+		playerX = self.results.players.Find("Player X")
+		for week in range(1, scrape.LastRegularSeasonWeek + 1):
+			self.assertEqual(index.Owner(playerX, week), None)
+		self.assertEqual(index.Owner(self.results.players.Find("Player Y"), 6), "A")
+
+	def testPickedUpAndDroppedInSameWeek(self):
+		Move(self.results, self.sixthWeek, "A", "Player X", 3)
+		Move(self.results, self.sixthWeek, "A", "Player Y", 0, "Player X")
+
+		acquisitions = scrape.BuildAcquisitions(self.results)
+		playerX = self.results.players.Find("Player X")
+		pickups = [ acquisition for acquisition in acquisitions if acquisition.playerId == playerX ]
+		self.assertEqual(len(pickups), 1)
+		self.assertEqual(pickups[0].cost, 3)
+		self.assertTrue(pickups[0].endWeek < pickups[0].week)
+		self.assertEqual(scrape.OwnershipIndex(acquisitions).Owner(playerX, 6), None)
+
+	def testDroppedAndPickedUpInSameWeekChangesHands(self):
+		Draft(self.results, "A", "Player X", 10)
+		Move(self.results, self.sixthWeek, "A", "Player Y", 0, "Player X")
+		Move(self.results, self.sixthWeek, "B", "Player X", 5)
+
+		index = self.index()
+		playerX = self.results.players.Find("Player X")
+		self.assertEqual(index.Owner(playerX, 5), "A")
+		self.assertEqual(index.Owner(playerX, 6), "B")
+		self.assertEqual(index.Owner(playerX, scrape.LastRegularSeasonWeek), "B")
+
+	def testMovesAfterRegularSeasonAreSkipped(self):
+		Draft(self.results, "A", "Player X", 10)
+		Move(self.results, "20170101", "B", "Player Y", 0, "Player X")
+
+		self.assertTrue(scrape.GetWeekForDate(2016, "20170101") > scrape.LastRegularSeasonWeek)
+		acquisitions = scrape.BuildAcquisitions(self.results)
+		self.assertEqual(len(acquisitions), 1)
+		self.assertEqual(acquisitions[0].endWeek, scrape.LastRegularSeasonWeek)
+
+if __name__ == '__main__':
+	unittest.main()
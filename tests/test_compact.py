@@ -0,0 +1,104 @@
+import hashlib
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import compact
+import extract
+import scrape
+
+'''
+Cache compaction against the raw pages in fixtures
+
+A compacted page has to give every parser exactly what the raw page gave.
+'''
+
+FixturesDir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+# cache directory -> (BeautifulSoup rows, streaming rows)
+Extractors = {
+	"boxscores" : (scrape.GetBoxscoreTables, extract.ExtractBoxscore),
+	"projections" : (scrape.GetProjectionRows, extract.ExtractProjections),
+	"waivers" : (scrape.GetWaiverRows, extract.ExtractWaivers)
+}
+
+# (directory, content) of every fixture page in directory
+def ReadPages(directory):
+	pages = []
+	dirname = os.path.join(FixturesDir, directory)
+	for item in sorted(os.listdir(dirname)):
+		with open(os.path.join(dirname, item), "rb") as f:
+			pages.append((item, f.read()))
+	return pages
+
+# playerData and standings from one boxscore page
+def ParseStats(content):
+	results = scrape.Results()
+	results.divisions["east"] = list(extract.ExtractBoxscore(content)[2])
+	results.InitializeWithOwners()
+	scrape.ParseStatsPage(content, results, week="1")
+	return [ list(row) for row in results.playerData ], [ results.standings[owner].toList(owner) for owner in sorted(results.standings) ]
+
+class CompactPageTest(unittest.TestCase):
+
+	def testPagesShrinkAndStayCompacted(self):
+		for directory in Extractors:
+			for item, content in ReadPages(directory):
+				compacted = scrape.CompactPage(directory, content)
+				self.assertTrue(scrape.IsCompacted(compacted), item)
+				self.assertTrue(len(compacted) < len(content), item)
+				self.assertTrue(scrape.CompactPage(directory, compacted) is compacted, item)
+
+	def testRowsMatchRawPages(self):
+		for directory in Extractors:
+			for item, content in ReadPages(directory):
+				compacted = scrape.CompactPage(directory, content)
+				for extractor in Extractors[directory]:
+					self.assertEqual(list(extractor(compacted)), list(extractor(content)), directory + "/" + item)
+
+	def testStatsMatchRawPages(self):
+		for item, content in ReadPages("boxscores"):
+			self.assertEqual(ParseStats(scrape.CompactPage("boxscores", content)), ParseStats(content), item)
+
+	def testPageMissingFragmentIsKeptWhole(self):
+		content = b"<html><body><div class=\"games-pageheader\">Week 1</div></body></html>"
+		self.assertTrue(scrape.CompactPage("boxscores", content) is content)
+
+	def testOtherDirectoriesAreKeptWhole(self):
+		for item, content in ReadPages("draft"):
+			self.assertTrue(scrape.CompactPage("draft", content) is content)
+
+class CompactDirectoryTest(unittest.TestCase):
+
+	def setUp(self):
+		self.dirname = os.path.join(tempfile.mkdtemp(), "boxscores")
+		shutil.copytree(os.path.join(FixturesDir, "boxscores"), self.dirname)
+
+	def tearDown(self):
+		shutil.rmtree(os.path.dirname(self.dirname))
+
+	def testManifestFollowsRewrittenPages(self):
+		items = sorted(os.listdir(self.dirname))
+		manifest = []
+		for item in items:
+			with open(os.path.join(self.dirname, item), "rb") as f:
+				manifest.append({ "file" : item, "week" : 1, "sha1" : hashlib.sha1(f.read()).hexdigest() })
+		scrape.WriteBoxscoreManifest(self.dirname, manifest)
+
+		pages, before, after = compact.CompactDirectory(self.dirname)
+		self.assertEqual(pages, len(items))
+		self.assertTrue(after < before)
+
+		for entry in scrape.LoadBoxscoreManifest(self.dirname):
+			with open(os.path.join(self.dirname, entry["file"]), "rb") as f:
+				scrape.VerifyBoxscore(entry, f.read())
+
+		# Running it again leaves everything alone
+		self.assertEqual(compact.CompactDirectory(self.dirname)[0], 0)
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,51 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import extract
+import scrape
+from test_compact import ReadPages
+
+'''
+Draft recap parsers on the fixture recap in both page layouts
+
+draft.html has every team in its own table like espn's recap and
+draft-single-table.html is the same recap with all teams in one table,
+which used to hand later teams' picks to every team above them.
+'''
+
+def ReadRecap(item):
+	return dict(ReadPages("draft"))[item]
+
+class DraftTest(unittest.TestCase):
+
+	def testExtractorsMatch(self):
+		for item, content in ReadPages("draft"):
+			self.assertEqual(list(extract.ExtractDraft(content)), list(scrape.GetDraftRows(content)), item)
+
+	def testLayoutsGiveSamePicks(self):
+		picks = list(scrape.GetDraftRows(ReadRecap("draft.html")))
+		self.assertTrue(len(picks) > 0)
+		self.assertEqual(list(scrape.GetDraftRows(ReadRecap("draft-single-table.html"))), picks)
+		self.assertEqual(list(extract.ExtractDraft(ReadRecap("draft-single-table.html"))), picks)
+
+	def testEveryPlayerDraftedOnce(self):
+		for item, content in ReadPages("draft"):
+			players = [ pick[1] for pick in extract.ExtractDraft(content) ]
+			self.assertEqual(len(players), len(set(players)), item)
+
+	def testDraftMapFollowsPicks(self):
+		results = scrape.Results()
+		scrape.ParseDraftPage(ReadRecap("draft-single-table.html"), results)
+
+		owners = set()
+		for draftInfo in results.allDraftData:
+			owners.add(draftInfo.owner)
+			self.assertEqual(scrape.GetPlayerColumn(results.playerDraftMap, draftInfo.playerId), [draftInfo.owner, draftInfo.draftAmount])
+		self.assertEqual(len(owners), 10)
+
+if __name__ == '__main__':
+	unittest.main()
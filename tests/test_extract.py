@@ -0,0 +1,72 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import extract
+import scrape
+from test_compact import Extractors, FixturesDir, ReadPages
+
+'''
+Streaming extractors against the BeautifulSoup ones on the fixture pages
+'''
+
+# Small enough that tags, attributes and entities get split between chunks
+SmallChunkSize = 7
+
+class ExtractorTest(unittest.TestCase):
+
+	def setUp(self):
+		self.chunkSize = extract.ChunkSize
+
+	def tearDown(self):
+		extract.ChunkSize = self.chunkSize
+		scrape.UseStreamingExtractors = True
+
+	def assertSameRows(self):
+		for directory in Extractors:
+			soupRows, streamRows = Extractors[directory]
+			for item, content in ReadPages(directory):
+				self.assertEqual(list(streamRows(content)), list(soupRows(content)), directory + "/" + item)
+
+	def testRowsMatchSoup(self):
+		self.assertSameRows()
+
+	def testRowsMatchSoupInSmallChunks(self):
+		extract.ChunkSize = SmallChunkSize
+		self.assertSameRows()
+
+	def testVerifyExtractors(self):
+		for directory in Extractors:
+			self.assertTrue(scrape.VerifyExtractors(os.path.join(FixturesDir, directory)), directory)
+
+	def testBoxscoreRowsAreFound(self):
+		for item, content in ReadPages("boxscores"):
+			header, teamNames, owners, starters, benches = extract.ExtractBoxscore(content)
+			self.assertEqual(len(teamNames), 2, item)
+			self.assertEqual(len(owners), 2, item)
+			self.assertTrue(all([ len(rows) > 0 for rows in starters + benches ]), item)
+
+	# Whole pages parsed into Results both ways
+	def testResultsMatchSoup(self):
+		def parse():
+			results = scrape.Results()
+			results.year = 2016
+			for item, content in ReadPages("projections"):
+				scrape.ParseProjectionFile(content, 1, results)
+			# The default waiver page only lists the dates
+			for item, content in ReadPages("waivers"):
+				if item.startswith("waiver_"):
+					scrape.ParseWaiverPage(content, item[len("waiver_"):-len(".html")], results)
+			return [ list(row) for row in results.waiverWireMoves ], results.projections, results.players.names
+
+		streamed = parse()
+		self.assertTrue(len(streamed[0]) > 0 and len(streamed[1]) > 0)
+
+		scrape.UseStreamingExtractors = False
+		self.assertEqual(streamed, parse())
+
+if __name__ == '__main__':
+	unittest.main()
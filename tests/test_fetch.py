@@ -0,0 +1,60 @@
+import os
+import sys
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import scrape
+
+'''
+FetchAndParse with LoadContent swapped for an instant fetch
+'''
+
+PageCount = 200
+
+class FetchAndParseTest(unittest.TestCase):
+
+	def setUp(self):
+		self.loadContent = scrape.LoadContent
+		self.lock = threading.Lock()
+		self.fetched = 0
+		self.parsed = []
+		self.mostHeld = 0
+
+		def load(url, directory, filename):
+			with self.lock:
+				self.fetched += 1
+				self.mostHeld = max(self.mostHeld, self.fetched - len(self.parsed))
+			return url
+		scrape.LoadContent = load
+
+	def tearDown(self):
+		scrape.LoadContent = self.loadContent
+
+	def parse(self, content, context):
+		# Slower than the fetches so they would run ahead
+		time.sleep(0.0005)
+		with self.lock:
+			self.parsed.append(context)
+
+	def testPagesParsedInOrder(self):
+		jobs = [ (i, "pages", "page_%d.html" % i, i) for i in range(PageCount) ]
+		scrape.FetchAndParse(jobs, self.parse)
+		self.assertEqual(self.parsed, list(range(PageCount)))
+
+	def testFetchesWaitForParser(self):
+		jobs = [ (i, "pages", "page_%d.html" % i, i) for i in range(PageCount) ]
+		scrape.FetchAndParse(jobs, self.parse)
+		self.assertEqual(self.fetched, PageCount)
+		self.assertTrue(self.mostHeld <= scrape.PageQueueSize, self.mostHeld)
+
+	def testFailedFetchIsRaised(self):
+		def load(url, directory, filename):
+			raise IOError(url)
+		scrape.LoadContent = load
+		self.assertRaises(IOError, scrape.FetchAndParse, [ (0, "pages", "page_0.html", 0) ], self.parse)
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,96 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import scrape
+
+'''
+Player name normalization and the registry every page interns into
+'''
+
+class NormalizePlayerNameTest(unittest.TestCase):
+
+	def testPunctuationAndCase(self):
+		self.assertEqual(scrape.NormalizePlayerName(" Le'Veon Bell "), "leveon bell")
+		self.assertEqual(scrape.NormalizePlayerName("A.J. Green"), scrape.NormalizePlayerName("AJ Green"))
+
+	def testSuffixesDropped(self):
+		self.assertEqual(scrape.NormalizePlayerName("Odell Beckham Jr."), "odell beckham")
+		self.assertEqual(scrape.NormalizePlayerName("Robert Griffin III"), "robert griffin")
+		# A name that is only a suffix is kept
+		self.assertEqual(scrape.NormalizePlayerName("V"), "v")
+
+	def testDefenses(self):
+		for name in ["Broncos D/ST", "Broncos DST", "Broncos Defense", "broncos def"]:
+			self.assertEqual(scrape.NormalizePlayerName(name), "broncos d/st")
+
+class PlayerRegistryTest(unittest.TestCase):
+
+	def setUp(self):
+		self.players = scrape.PlayerRegistry()
+
+	def testInternAndFind(self):
+		first = self.players.Intern("Odell Beckham Jr.")
+		second = self.players.Intern("Tom Brady")
+		self.assertEqual([first, second], [0, 1])
+		self.assertEqual(self.players.Intern("Odell Beckham"), first)
+		self.assertEqual(self.players.Find("odell beckham jr"), first)
+		self.assertEqual(self.players.Find("Drew Brees"), -1)
+		self.assertEqual(len(self.players), 2)
+
+	def testSmallestSpellingKept(self):
+		playerId = self.players.Intern("Odell Beckham Jr.")
+		self.players.Intern("Odell Beckham")
+		self.players.Intern("Odell Beckham Jr")
+		self.assertEqual(self.players.Name(playerId), "Odell Beckham")
+
+	def testCollisionsRecorded(self):
+		self.players.Intern("Steve Smith")
+		self.players.Intern("Steve Smith")
+		self.assertEqual(self.players.collisions, {})
+
+		self.players.Intern("Steve Smith Sr.")
+		self.assertEqual(self.players.collisions, { "steve smith" : set(["Steve Smith", "Steve Smith Sr."]) })
+
+	def testAliases(self):
+		playerId = self.players.Intern("Stevie Johnson")
+		self.players.AddAlias("Steve Johnson", "Stevie Johnson")
+		self.assertEqual(self.players.Find("Steve Johnson"), playerId)
+		self.assertEqual(self.players.Intern("Steve Johnson"), playerId)
+
+	def testRenumberFollowsNameOrder(self):
+		for name in ["Tom Brady", "Drew Brees", "Aaron Rodgers"]:
+			self.players.Intern(name)
+
+		newIds = self.players.Renumber()
+		self.assertEqual(newIds, [2, 1, 0])
+		self.assertEqual(self.players.names, ["Aaron Rodgers", "Drew Brees", "Tom Brady"])
+		self.assertEqual(self.players.Find("Tom Brady"), 2)
+
+	def testRollbackForgetsLaterPlayers(self):
+		self.players.Intern("Tom Brady")
+		self.players.RecordJoin("draft", True)
+		mark = self.players.Mark()
+
+		self.players.Intern("Drew Brees")
+		self.players.Intern("Tom Brady Jr.")
+		self.players.RecordJoin("draft", False)
+
+		self.players.Rollback(mark)
+		self.assertEqual(self.players.names, ["Tom Brady"])
+		self.assertEqual(self.players.Find("Drew Brees"), -1)
+		self.assertEqual(self.players.joins, { "draft" : [1, 0] })
+		self.assertEqual(self.players.collisions, {})
+		self.assertEqual(self.players.Intern("Drew Brees"), 1)
+
+	def testMissRate(self):
+		self.assertEqual(self.players.MissRate("projections"), 0.0)
+		for hit in [True, True, True, False]:
+			self.players.RecordJoin("projections", hit)
+		self.assertEqual(self.players.joins["projections"], [4, 1])
+		self.assertEqual(self.players.MissRate("projections"), 0.25)
+
+if __name__ == '__main__':
+	unittest.main()